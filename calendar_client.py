@@ -3,9 +3,12 @@ Calendar Client — Google Calendar API Integration
 Fetches availability and creates confirmed interview events.
 """
 
+from collections import OrderedDict
 from datetime import datetime, timedelta, time
+from time import monotonic
 from typing import Optional
 import json
+import threading
 
 # Google Calendar SDK (install: pip install google-auth google-auth-oauthlib google-api-python-client)
 try:
@@ -13,11 +16,27 @@ try:
     from google.oauth2 import service_account
     from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
+    from google_auth_httplib2 import AuthorizedHttp
+    import httplib2
     GOOGLE_AVAILABLE = True
 except ImportError:
     GOOGLE_AVAILABLE = False
     print("[Calendar] Warning: google-api-python-client not installed. Using mock mode.")
 
+# Redis is optional — shares the freebusy cache across agent workers
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# NumPy is optional — used to vectorize slot generation when available
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 
 class CalendarClient:
     """
@@ -32,27 +51,48 @@ class CalendarClient:
 
     def __init__(self, auth_config: dict):
         self.auth_config = auth_config
-        self.services: dict = {}  # Cache of {email: service}
+        self._base_creds = None     # Service-account key, parsed once and re-subjected per email
+        # httplib2.Http is not thread-safe, so each thread gets its own keep-alive
+        # transport, shared by the per-email services it builds: .http, .services
+        self._local = threading.local()
+        # Short-lived freebusy cache: {(email, days_ahead): (ts, busy_periods)}. Busy periods
+        # don't depend on the slot duration, so neither this key nor the redis one has it.
+        self._fb_cache: dict[tuple, tuple[float, list]] = {}
+        self._fb_lock = threading.Lock()
+        self.cache_ttl_seconds = auth_config.get("cache_ttl_seconds", 45)
+        self._redis = None
+        if auth_config.get("redis_url"):
+            if REDIS_AVAILABLE:
+                self._redis = redis.Redis.from_url(auth_config["redis_url"], decode_responses=False)
+            else:
+                print("[Calendar] Warning: redis not installed. Using in-process freebusy cache.")
         self.working_hours_start = time(9, 0)   # 9:00 AM
         self.working_hours_end = time(18, 0)    # 6:00 PM
-        self.working_days = {0, 1, 2, 3, 4}    # Mon–Fri (weekday() values)
+        self.working_days = frozenset({0, 1, 2, 3, 4})  # Mon–Fri (weekday() values)
 
     def _get_service(self, email: str = None):
         """Get or create a Google Calendar API service instance."""
         if not GOOGLE_AVAILABLE:
             return MockCalendarService()
 
+        local = self._local
+        if not hasattr(local, "services"):
+            local.http = httplib2.Http(cache=".http_cache", timeout=30)
+            local.services = {}  # Cache of {email: service}
+
         cache_key = email or "default"
-        if cache_key in self.services:
-            return self.services[cache_key]
+        if cache_key in local.services:
+            return local.services[cache_key]
 
         auth_type = self.auth_config.get("type", "service_account")
 
         if auth_type == "service_account":
-            creds = service_account.Credentials.from_service_account_file(
-                self.auth_config["service_account_file"],
-                scopes=self.SCOPES,
-            )
+            if self._base_creds is None:
+                self._base_creds = service_account.Credentials.from_service_account_file(
+                    self.auth_config["service_account_file"],
+                    scopes=self.SCOPES,
+                )
+            creds = self._base_creds
             if email:
                 # Domain-wide delegation — impersonate the user
                 creds = creds.with_subject(email)
@@ -63,8 +103,14 @@ class CalendarClient:
         else:
             raise ValueError(f"Unknown auth type: {auth_type}")
 
-        service = build("calendar", "v3", credentials=creds)
-        self.services[cache_key] = service
+        # Use the discovery document bundled with the client library —
+        # no discovery.googleapis.com round trip per impersonated user
+        service = build(
+            "calendar", "v3",
+            http=AuthorizedHttp(creds, http=local.http),
+            static_discovery=True,
+        )
+        local.services[cache_key] = service
         return service
 
     # ─────────────────────────────────────────
@@ -81,52 +127,221 @@ class CalendarClient:
         Return list of free slots within working hours for the next N days.
         Uses Google's freebusy API to query existing commitments.
         """
-        service = self._get_service(email)
+        slots = self._find_free_slots([email], duration_minutes, days_ahead, exclude_slots)
+        print(f"[Calendar] Found {len(slots)} available slots for {email}")
+        return slots
+
+    def get_mutual_slots(
+        self,
+        emails: list[str],
+        duration_minutes: int = 60,
+        days_ahead: int = 14,
+        exclude_slots: list = None,
+    ) -> list[dict]:
+        """
+        Return free slots shared by every attendee.
+        All calendars are fetched in a single freebusy request.
+        """
+        slots = self._find_free_slots(emails, duration_minutes, days_ahead, exclude_slots)
+        print(f"[Calendar] Found {len(slots)} mutual slots for {', '.join(emails)}")
+        return slots
+
+    def _find_free_slots(
+        self,
+        emails: list[str],
+        duration_minutes: int,
+        days_ahead: int,
+        exclude_slots: list = None,
+    ) -> list[dict]:
         now = datetime.utcnow()
         time_max = now + timedelta(days=days_ahead)
 
+        busy_by_email = self._query_busy(emails, now, time_max, days_ahead)
+
+        # Merged intervals have both starts and ends sorted, which the
+        # searchsorted lookup below relies on
+        busy = self._merge_busy([
+            (self._parse_dt(b["start"]), self._parse_dt(b["end"]))
+            for periods in busy_by_email.values()
+            for b in periods
+        ])
+
+        # Generate candidate slots within working hours
+        excluded_starts = frozenset(s.get("start") for s in (exclude_slots or []))
+        slots = []
+        first = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=2)
+        if NUMPY_AVAILABLE:
+            free_starts = self._free_starts_np(first, time_max, duration_minutes, busy)
+        else:
+            free_starts = self._free_starts(first, time_max, duration_minutes, busy)
+
+        for current in free_starts:
+            slot_end = current + timedelta(minutes=duration_minutes)
+            start = current.isoformat()
+            if start not in excluded_starts:
+                slots.append({"start": start, "end": slot_end.isoformat()})
+                if len(slots) >= 10:
+                    break
+
+        return slots
+
+    def _free_starts(self, first: datetime, time_max: datetime, duration_minutes: int, busy: list):
+        """Yield working-hours slot starts in [first, time_max) that don't overlap `busy`."""
+        day_start = self.working_hours_start.hour * 60 + self.working_hours_start.minute
+        day_end = self.working_hours_end.hour * 60 + self.working_hours_end.minute
+        bi = 0  # first busy interval that may still overlap `current`
+
+        opening = {"hour": self.working_hours_start.hour, "minute": self.working_hours_start.minute}
+
+        current = first
+        while current < time_max:
+            minute_of_day = current.hour * 60 + current.minute
+            # Outside working hours: jump straight to the next opening
+            # instead of stepping 30 minutes through nights and weekends
+            if (
+                current.weekday() not in self.working_days
+                or minute_of_day + duration_minutes > day_end
+            ):
+                current = (current + timedelta(days=1)).replace(**opening)
+                continue
+            if minute_of_day < day_start:
+                current = current.replace(**opening)
+                continue
+
+            # Busy is sorted by start and `current` only moves forward,
+            # so intervals that ended before it can be dropped for good
+            while bi < len(busy) and busy[bi][1] <= current:
+                bi += 1
+            slot_end = current + timedelta(minutes=duration_minutes)
+            if not self._overlaps_busy(current, slot_end, busy, bi):
+                yield current
+            current += timedelta(minutes=30)
+
+    def _free_starts_np(self, first: datetime, time_max: datetime, duration_minutes: int, busy: list) -> list:
+        """Vectorized _free_starts: working-hours masks plus a searchsorted busy lookup."""
+        day_start = self.working_hours_start.hour * 60 + self.working_hours_start.minute
+        day_end = self.working_hours_end.hour * 60 + self.working_hours_end.minute
+
+        starts = np.arange(
+            np.datetime64(first, "m"),
+            np.datetime64(time_max, "m"),
+            np.timedelta64(30, "m"),
+        )
+        days = starts.astype("datetime64[D]")
+        weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        minute_of_day = (starts - days).astype(np.int64)
+        starts = starts[
+            np.isin(weekday, list(self.working_days))
+            & (minute_of_day >= day_start)
+            & (minute_of_day + duration_minutes <= day_end)
+        ].astype("datetime64[s]")
+
+        if busy:
+            busy_start = np.array([b[0] for b in busy], dtype="datetime64[s]")
+            busy_end = np.array([b[1] for b in busy], dtype="datetime64[s]")
+            ends = starts + np.timedelta64(duration_minutes, "m")
+            # First busy interval ending after each slot start; the slot is free
+            # unless that interval also starts before the slot ends
+            idx = np.searchsorted(busy_end, starts, side="right")
+            hit = idx < len(busy)
+            hit[hit] = busy_start[idx[hit]] < ends[hit]
+            starts = starts[~hit]
+
+        return starts.astype("datetime64[us]").tolist()
+
+    def _query_busy(
+        self,
+        emails: list[str],
+        now: datetime,
+        time_max: datetime,
+        days_ahead: int,
+    ) -> dict[str, list]:
+        """
+        Return {email: busy_periods}, serving recent answers from the cache
+        and fetching every remaining calendar in one freebusy round trip.
+        """
+        busy_by_email = {}
+        missing = []
+        if self._redis is not None:
+            try:
+                raws = self._redis.mget([_fb_redis_key(email, days_ahead) for email in emails])
+            except redis.RedisError as e:
+                print(f"[Calendar] redis get failed: {e}")
+                raws = [None] * len(emails)
+            for email, raw in zip(emails, raws):
+                if raw is not None:
+                    busy_by_email[email] = json.loads(raw)
+                else:
+                    missing.append(email)
+        else:
+            with self._fb_lock:
+                for email in emails:
+                    cached = self._fb_cache.get((email, days_ahead))
+                    if cached and monotonic() - cached[0] < self.cache_ttl_seconds:
+                        busy_by_email[email] = cached[1]
+                    else:
+                        missing.append(email)
+
+        if not missing:
+            return busy_by_email
+
+        service = self._get_service(emails[0])
+
         # Query freebusy
         body = {
             "timeMin": now.isoformat() + "Z",
             "timeMax": time_max.isoformat() + "Z",
-            "items": [{"id": email}],
+            "items": [{"id": email} for email in missing],
         }
 
         try:
             freebusy = service.freebusy().query(body=body).execute()
-            busy_periods = freebusy.get("calendars", {}).get(email, {}).get("busy", [])
+            calendars = freebusy.get("calendars", {})
+            for email in missing:
+                busy_by_email[email] = calendars.get(email, {}).get("busy", [])
         except Exception as e:
             print(f"[Calendar] freebusy query failed: {e}")
-            busy_periods = []
-
-        busy = [
-            (self._parse_dt(b["start"]), self._parse_dt(b["end"]))
-            for b in busy_periods
-        ]
-
-        # Generate candidate slots within working hours
-        slots = []
-        current = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=2)
-
-        while current < time_max and len(slots) < 10:
-            if (
-                current.weekday() in self.working_days
-                and self.working_hours_start <= current.time() < self.working_hours_end
-            ):
-                slot_end = current + timedelta(minutes=duration_minutes)
-                # Ensure slot ends within working hours
-                if slot_end.time() <= self.working_hours_end:
-                    if not self._overlaps_busy(current, slot_end, busy):
-                        slot = {
-                            "start": current.isoformat(),
-                            "end": slot_end.isoformat(),
-                        }
-                        if not self._in_excluded(slot, exclude_slots or []):
-                            slots.append(slot)
-            current += timedelta(minutes=30)
+            for email in missing:
+                busy_by_email[email] = []
+            return busy_by_email
 
-        print(f"[Calendar] Found {len(slots)} available slots for {email}")
-        return slots
+        if self._redis is None:
+            self._fb_cache_put(missing, days_ahead, busy_by_email)
+        else:
+            try:
+                pipe = self._redis.pipeline()
+                for email in missing:
+                    key = _fb_redis_key(email, days_ahead)
+                    pipe.setex(key, self.cache_ttl_seconds, json.dumps(busy_by_email[email]))
+                    # Per-email index of live keys, so invalidate() needn't scan the keyspace
+                    pipe.sadd(_fb_redis_index(email), key)
+                    pipe.expire(_fb_redis_index(email), self.cache_ttl_seconds)
+                pipe.execute()
+            except redis.RedisError as e:
+                print(f"[Calendar] redis set failed: {e}")
+
+        return busy_by_email
+
+    def _fb_cache_put(self, emails: list[str], days_ahead: int, busy_by_email: dict):
+        """Store fresh busy periods, sweeping out entries past the TTL first."""
+        now = monotonic()
+        with self._fb_lock:
+            for key in [k for k, (ts, _) in self._fb_cache.items() if now - ts >= self.cache_ttl_seconds]:
+                del self._fb_cache[key]
+            for email in emails:
+                self._fb_cache[(email, days_ahead)] = (now, busy_by_email[email])
+
+    def _merge_busy(self, busy: list) -> list:
+        """Sort busy intervals by start and merge any that overlap."""
+        busy.sort(key=lambda b: b[0])
+        merged = []
+        for b_start, b_end in busy:
+            if merged and b_start <= merged[-1][1]:
+                if b_end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], b_end)
+            else:
+                merged.append((b_start, b_end))
+        return merged
 
     # ─────────────────────────────────────────
     # Create a calendar event
@@ -176,6 +391,8 @@ class CalendarClient:
                 conferenceDataVersion=1 if video_link else 0,
             ).execute()
             print(f"[Calendar] ✅ Event created: {event.get('id')} — {title}")
+            for addr in attendees:
+                self.invalidate(addr)
             return {
                 "event_id": event.get("id"),
                 "html_link": event.get("htmlLink"),
@@ -194,29 +411,61 @@ class CalendarClient:
                 eventId=event_id,
                 sendUpdates="all",
             ).execute()
+            self.invalidate(organizer_email)
             return True
         except Exception as e:
             print(f"[Calendar] delete_event failed: {e}")
             return False
 
+    def invalidate(self, email: str):
+        """Drop cached freebusy results for a mailbox (call after booking changes)."""
+        with self._fb_lock:
+            for key in [k for k in self._fb_cache if k[0] == email]:
+                del self._fb_cache[key]
+        if self._redis is not None:
+            try:
+                index = _fb_redis_index(email)
+                self._redis.delete(index, *self._redis.smembers(index))
+            except redis.RedisError as e:
+                print(f"[Calendar] redis invalidate failed: {e}")
+
     # ─────────────────────────────────────────
     # Helpers
     # ─────────────────────────────────────────
     def _parse_dt(self, dt_str: str) -> datetime:
+        # Fast path: freebusy returns UTC as "2025-03-10T14:30:00.000Z"
+        if dt_str.endswith("Z"):
+            try:
+                return datetime(
+                    int(dt_str[0:4]), int(dt_str[5:7]), int(dt_str[8:10]),
+                    int(dt_str[11:13]), int(dt_str[14:16]), int(dt_str[17:19]),
+                )
+            except ValueError:
+                pass
         dt_str = dt_str.replace("Z", "+00:00")
         try:
             return datetime.fromisoformat(dt_str).replace(tzinfo=None)
         except ValueError:
             return datetime.strptime(dt_str[:19], "%Y-%m-%dT%H:%M:%S")
 
-    def _overlaps_busy(self, start: datetime, end: datetime, busy: list) -> bool:
-        for b_start, b_end in busy:
-            if start < b_end and end > b_start:
+    def _overlaps_busy(self, start: datetime, end: datetime, busy: list, first: int = 0) -> bool:
+        """Check sorted `busy` from index `first`, stopping once intervals start after `end`."""
+        for i in range(first, len(busy)):
+            b_start, b_end = busy[i]
+            if b_start >= end:
+                break
+            if start < b_end and b_start < end:
                 return True
         return False
 
-    def _in_excluded(self, slot: dict, excluded: list) -> bool:
-        return any(s.get("start") == slot["start"] for s in excluded)
+
+def _fb_redis_key(email: str, days_ahead: int) -> str:
+    return f"fb:{email}:{days_ahead}"
+
+
+def _fb_redis_index(email: str) -> str:
+    """Set of an email's live fb: keys."""
+    return f"fbkeys:{email}"
 
 
 # ─────────────────────────────────────────
@@ -262,9 +511,12 @@ class MockCalendarClient(CalendarClient):
     """Drop-in replacement for testing without Google credentials."""
 
     def __init__(self):
+        self._fb_cache = {}
+        self._fb_lock = threading.Lock()
+        self._redis = None
         self.working_hours_start = time(9, 0)
         self.working_hours_end = time(18, 0)
-        self.working_days = {0, 1, 2, 3, 4}
+        self.working_days = frozenset({0, 1, 2, 3, 4})
 
     def get_available_slots(self, email, duration_minutes=60, days_ahead=14, exclude_slots=None):
         """Return mock slots for testing."""
@@ -295,3 +547,75 @@ class MockCalendarClient(CalendarClient):
     def delete_event(self, organizer_email, event_id):
         print(f"[MockCalendar] Deleted event {event_id}")
         return True
+
+
+# ─────────────────────────────────────────
+# Availability cache in front of any calendar client
+# ─────────────────────────────────────────
+
+class CachedCalendarClient:
+    """
+    Wraps a CalendarClient (or MockCalendarClient) and caches
+    get_available_slots results for ttl_seconds.
+    Entries for an attendee are dropped when an event is booked for them.
+    """
+
+    CACHE_MAXSIZE = 1024
+
+    def __init__(self, inner, ttl_seconds: int = 300):
+        self._inner = inner
+        self.ttl_seconds = ttl_seconds
+        # LRU of {(email, duration_minutes, days_ahead, excluded_starts): (ts, slots)}
+        self._cache: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def get_available_slots(self, email, duration_minutes=60, days_ahead=14, exclude_slots=None):
+        excluded = frozenset(s.get("start") for s in (exclude_slots or []))
+        key = (email, duration_minutes, days_ahead, excluded)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached and monotonic() - cached[0] < self.ttl_seconds:
+                self._cache.move_to_end(key)
+                return list(cached[1])
+
+        slots = self._inner.get_available_slots(
+            email=email,
+            duration_minutes=duration_minutes,
+            days_ahead=days_ahead,
+            exclude_slots=exclude_slots,
+        )
+        self._cache_put(key, slots)
+        return list(slots)  # callers extend their copy; keep the cached list intact
+
+    def _cache_put(self, key: tuple, slots: list):
+        now = monotonic()
+        with self._cache_lock:
+            for stale in [k for k, (ts, _) in self._cache.items() if now - ts >= self.ttl_seconds]:
+                del self._cache[stale]
+            self._cache[key] = (now, slots)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_MAXSIZE:
+                self._cache.popitem(last=False)
+
+    def create_event(self, title, start, end, attendees, **kwargs):
+        event = self._inner.create_event(title, start, end, attendees, **kwargs)
+        if "error" not in event:
+            for addr in attendees:
+                self.invalidate(addr)
+        return event
+
+    def delete_event(self, organizer_email, event_id):
+        deleted = self._inner.delete_event(organizer_email, event_id)
+        self.invalidate(organizer_email)
+        return deleted
+
+    def invalidate(self, email: str):
+        """Drop cached availability for a mailbox (e.g. from a calendar push notification)."""
+        with self._cache_lock:
+            for key in [k for k in self._cache if k[0] == email]:
+                del self._cache[key]
+        if hasattr(self._inner, "invalidate"):
+            self._inner.invalidate(email)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
@@ -36,6 +36,13 @@ CALENDAR_CONFIG = {
     # Option B: OAuth2 (for single user)
     # "type": "oauth2",
     # "token_file": "credentials/token.json",
+
+    # Seconds to reuse a freebusy answer for the same mailbox
+    "cache_ttl_seconds": 45,
+
+    # Optional: share the freebusy cache across workers (pip install redis).
+    # Run the server with `maxmemory-policy allkeys-lfu` so busy mailboxes stay hot.
+    # "redis_url": "redis://localhost:6379/0",
 }
 
 # ─────────────────────────────────────────
@@ -6,15 +6,33 @@ Handles sending interview emails and parsing inbound replies.
 import smtplib
 import imaplib
 import email
+import html
 import re
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.header import decode_header
+from email.header import decode_header, make_header
+from collections import deque
 from datetime import datetime
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 
+# Request-ID patterns, most to least specific (see _extract_request_id)
+_RID_BRACKET = re.compile(r"\[Request\s+ID:\s*(req_[\w\-]+)\]", re.IGNORECASE)
+_RID_BARE = re.compile(r"\b(req_[\w\-]+)\b")
+_RID_LOOSE = re.compile(r"req[_\-]([\w\-]+)", re.IGNORECASE)
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+# Headers plus the first MIME part only — attachments are never downloaded
+_FETCH_PARTS = "(BODY.PEEK[HEADER] BODY.PEEK[1.MIME] BODY.PEEK[1])"
+# A section label and its value: a {n} literal (the bytes follow in the tuple), NIL or a quoted string
+_FETCH_SECTION = re.compile(rb'BODY\[([^\]]*)\](?:<\d+>)?\s+(\{\d+\}|NIL|"(?:[^"\\]|\\.)*")', re.IGNORECASE)
+
+
 @dataclass
 class ParsedEmail:
     sender: str
@@ -39,12 +57,41 @@ class EmailClient:
         self.password = config["password"]
         self.from_name = config.get("from_name", "Interview Scheduling Assistant")
         self.from_address = config["from_address"]
-        self.sent_emails = []  # track sent emails for summary
+        self.sent_emails = deque(maxlen=1000)  # track recent sent emails for summary
+
+        self._pool = ThreadPoolExecutor(max_workers=config.get("max_workers", 10))
+        # Keep-alive SMTP connections, one per concurrent send (at most smtp_connections);
+        # a send checks one out, so sends from different threads don't queue on each other
+        self._smtp_slots = threading.BoundedSemaphore(config.get("smtp_connections", 4))
+        self._smtp_lock = threading.Lock()  # guards _smtp_idle
+        self._smtp_idle: list[smtplib.SMTP] = []
+        # Polls reuse one logged-in IMAP session instead of reconnecting each time
+        self._imap_lock = threading.Lock()
+        self._imap: Optional[imaplib.IMAP4_SSL] = None
 
     # ─────────────────────────────────────────
     # Send email via SMTP
     # ─────────────────────────────────────────
     def send(self, to: str, subject: str, body: str, reply_to: str = None) -> bool:
+        return self._send_sync(to, subject, body, reply_to)
+
+    def send_async(self, to: str, subject: str, body: str, reply_to: str = None) -> Future:
+        """Queue an email on the background pool; the Future resolves to send()'s result."""
+        return self._pool.submit(self._send_sync, to, subject, body, reply_to)
+
+    def close(self):
+        """Wait for queued sends, then drop the SMTP and IMAP connections."""
+        self._pool.shutdown(wait=True)
+        with self._smtp_lock:
+            idle, self._smtp_idle = self._smtp_idle, []
+        for server in idle:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._drop_imap()
+
+    def _send_sync(self, to: str, subject: str, body: str, reply_to: str = None) -> bool:
         msg = MIMEMultipart("alternative")
         msg["From"] = f"{self.from_name} <{self.from_address}>"
         msg["To"] = to
@@ -59,57 +106,79 @@ class EmailClient:
         html_body = self._plain_to_html(body)
         msg.attach(MIMEText(html_body, "html"))
 
-        try:
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.ehlo()
-                server.starttls()
-                server.login(self.username, self.password)
-                server.sendmail(self.from_address, to, msg.as_string())
-            print(f"[Email] ✅ Sent to {to}: {subject}")
-            self.sent_emails.append({"to": to, "subject": subject})
-            return True
-        except smtplib.SMTPException as e:
-            print(f"[Email] ❌ Failed to send to {to}: {e}")
-            return False
+        with self._smtp_slots:
+            server = None
+            try:
+                server = self._checkout_smtp()
+                try:
+                    server.sendmail(self.from_address, to, msg.as_string())
+                except smtplib.SMTPServerDisconnected:
+                    # Idle connection was dropped by the server — reconnect once
+                    server = self._connect_smtp()
+                    server.sendmail(self.from_address, to, msg.as_string())
+            except smtplib.SMTPException as e:
+                print(f"[Email] ❌ Failed to send to {to}: {e}")
+                if server is not None:
+                    server.close()
+                return False
+            with self._smtp_lock:
+                self._smtp_idle.append(server)
+        print(f"[Email] ✅ Sent to {to}: {subject}")
+        self.sent_emails.append({"to": to, "subject": subject})
+        return True
+
+    def _checkout_smtp(self) -> smtplib.SMTP:
+        """Take an idle logged-in SMTP connection, or open one. Caller holds an _smtp_slots slot."""
+        with self._smtp_lock:
+            if self._smtp_idle:
+                return self._smtp_idle.pop()
+        return self._connect_smtp()
+
+    def _connect_smtp(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        server.ehlo()
+        server.starttls()
+        server.login(self.username, self.password)
+        return server
 
     # ─────────────────────────────────────────
     # Poll IMAP for new replies
     # ─────────────────────────────────────────
-    def fetch_new_replies(self) -> list[ParsedEmail]:
+    def fetch_new_replies(self, batch_size: int = 50) -> list[ParsedEmail]:
         """
         Fetch ONLY scheduling reply emails — emails that contain
         a [Request ID: req_...] in subject or body.
         Ignores all other inbox emails (newsletters, notifications, etc.)
+        Messages are fetched batch_size at a time, one FETCH per batch.
         """
         parsed_emails = []
         try:
-            with imaplib.IMAP4_SSL(self.imap_host, self.imap_port) as mail:
-                mail.login(self.username, self.password)
-                mail.select("INBOX")
+            with self._imap_lock:
+                mail = self._get_imap()
 
                 # ONLY search for emails with "Request ID" or "req_" in subject
-                # This filters out Quora, Udemy, and all other newsletters
-                search_criteria = [
-                    'SUBJECT "Interview Scheduling"',
-                    'SUBJECT "req_"',
-                    'SUBJECT "Interview Confirmed"',
-                ]
-
-                candidate_msg_ids = set()
-                for criteria in search_criteria:
-                    _, msg_ids = mail.search(None, criteria)
-                    if msg_ids[0]:
-                        for mid in msg_ids[0].split():
-                            candidate_msg_ids.add(mid)
+                # This filters out Quora, Udemy, and all other newsletters.
+                # One OR search, restricted to UNSEEN — processed mail is marked
+                # \Seen below, so the server skips it on the next poll.
+                _, msg_ids = mail.search(
+                    None,
+                    "UNSEEN",
+                    "OR", "OR",
+                    "SUBJECT", '"Interview Scheduling"',
+                    "SUBJECT", '"req_"',
+                    "SUBJECT", '"Interview Confirmed"',
+                )
+                candidate_msg_ids = set(msg_ids[0].split()) if msg_ids[0] else set()
 
                 print(f"[Email] Found {len(candidate_msg_ids)} scheduling email(s) to check")
 
-                for msg_id in candidate_msg_ids:
-                    _, msg_data = mail.fetch(msg_id, "(RFC822)")
-                    if not msg_data or not msg_data[0]:
-                        continue
-                    raw = msg_data[0][1]
-                    parsed = self._parse_raw_email(raw)
+                msg_ids = sorted(candidate_msg_ids, key=int)
+                raw_by_id = {}
+                for i in range(0, len(msg_ids), batch_size):
+                    raw_by_id.update(self._fetch_messages(mail, msg_ids[i:i + batch_size]))
+
+                for msg_id, (header, first_part) in raw_by_id.items():
+                    parsed = self._parse_raw_email(header, first_part)
                     if not parsed:
                         continue
 
@@ -128,35 +197,135 @@ class EmailClient:
                     # Mark as read
                     mail.store(msg_id, "+FLAGS", "\\Seen")
 
+        except (imaplib.IMAP4.abort, OSError) as e:
+            # Session dropped (timeout, server restart) — reconnect on the next poll
+            print(f"[Email] IMAP connection lost: {e}")
+            self._drop_imap()
         except imaplib.IMAP4.error as e:
+            # BAD/NO after a server-side logout or failed SELECT leaves the session
+            # unusable too — start a fresh one on the next poll
             print(f"[Email] IMAP error: {e}")
+            self._drop_imap()
         except Exception as e:
             print(f"[Email] Unexpected error in fetch_new_replies: {e}")
 
         return parsed_emails
 
-    def _parse_raw_email(self, raw_email: bytes) -> Optional[ParsedEmail]:
-        msg = email.message_from_bytes(raw_email)
+    def _get_imap(self) -> imaplib.IMAP4_SSL:
+        """Return the logged-in IMAP session with INBOX selected, opening it if needed. Caller holds _imap_lock."""
+        if self._imap is None:
+            mail = imaplib.IMAP4_SSL(self.imap_host, self.imap_port)
+            mail.login(self.username, self.password)
+            mail.select("INBOX")
+            self._imap = mail
+        return self._imap
+
+    def _drop_imap(self):
+        with self._imap_lock:
+            if self._imap is not None:
+                try:
+                    self._imap.logout()
+                except (imaplib.IMAP4.error, OSError):
+                    pass
+                self._imap = None
+
+    def _fetch_messages(self, mail, msg_ids: list[bytes]) -> dict[bytes, tuple[bytes, bytes]]:
+        """
+        Fetch all messages in one FETCH over a comma-separated id set.
+        Falls back to parallel per-message fetches if the server rejects it.
+        """
+        if not msg_ids:
+            return {}
+        try:
+            typ, data = mail.fetch(b",".join(msg_ids), _FETCH_PARTS)
+            if typ == "OK":
+                return self._split_fetch_response(data)
+        except imaplib.IMAP4.error as e:
+            print(f"[Email] Batched FETCH rejected ({e}) — fetching in parallel")
+        return self._fetch_parallel(msg_ids)
+
+    def _fetch_parallel(self, msg_ids: list[bytes], workers: int = 4) -> dict[bytes, tuple[bytes, bytes]]:
+        """Fetch messages over a few concurrent IMAP connections, one per worker."""
+        pending = queue.Queue()
+        for mid in msg_ids:
+            pending.put(mid)
+        raw_by_id = {}
+
+        def worker():
+            with imaplib.IMAP4_SSL(self.imap_host, self.imap_port) as conn:
+                conn.login(self.username, self.password)
+                conn.select("INBOX")
+                while True:
+                    try:
+                        mid = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    _, msg_data = conn.fetch(mid, _FETCH_PARTS)
+                    if msg_data and msg_data[0]:
+                        raw_by_id.update(self._split_fetch_response(msg_data))
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(msg_ids))) as pool:
+            for future in [pool.submit(worker) for _ in range(min(workers, len(msg_ids)))]:
+                future.result()
+
+        # Keep the original id order for the caller
+        return {mid: raw_by_id[mid] for mid in msg_ids if mid in raw_by_id}
+
+    def _split_fetch_response(self, data: list) -> dict[bytes, tuple[bytes, bytes]]:
+        """
+        Group a FETCH response into {msg_id: (header, first_part)}.
+        Sections arrive as (b'<id> (BODY[HEADER] {n}', bytes), (b' BODY[1.MIME] {n}', bytes), ...
+        where only the first item of each message carries its id. Empty sections
+        come back inline (b' BODY[1.MIME] NIL'), so every item is matched by label.
+        """
+        sections_by_id = {}
+        current = None
+        for item in data:
+            text, literal = item if isinstance(item, tuple) else (item, None)
+            if not text:
+                continue
+            if text[:1].isdigit():
+                current = sections_by_id.setdefault(text.split()[0], {})
+            if current is None:
+                continue
+            for match in _FETCH_SECTION.finditer(text):
+                label, value = match.group(1).upper(), match.group(2)
+                if value.startswith(b"{"):
+                    current[label] = literal or b""
+                elif value.startswith(b'"'):
+                    current[label] = value[1:-1]
+                else:
+                    current[label] = b""
+
+        split = {}
+        for mid, sections in sections_by_id.items():
+            header = sections.get(b"HEADER", b"")
+            mime = sections.get(b"1.MIME", b"")
+            # A single-part message has no MIME header of its own for part 1 —
+            # its Content-Type / Content-Transfer-Encoding are the top-level headers
+            if not mime.strip():
+                mime = header
+            split[mid] = (header, mime + sections.get(b"1", b""))
+        return split
+
+    def _parse_raw_email(self, header: bytes, first_part: bytes) -> Optional[ParsedEmail]:
+        msg = email.message_from_bytes(header)
 
         sender = email.utils.parseaddr(msg["From"])[1]
 
-        # Decode subject safely
+        # Decode subject safely (handles RFC 2047 encoded words anywhere in the string)
+        raw_subject = msg.get("Subject", "")
         try:
-            subject_parts = decode_header(msg.get("Subject", ""))
-            subject = ""
-            for part, enc in subject_parts:
-                if isinstance(part, bytes):
-                    subject += part.decode(enc or "utf-8", errors="replace")
-                else:
-                    subject += str(part)
+            subject = str(make_header(decode_header(raw_subject)))
         except Exception:
-            subject = str(msg.get("Subject", ""))
+            subject = str(raw_subject)
 
-        # Extract full body including quoted text (request ID may be in quoted section)
-        body = self._extract_body(msg)
+        # Extract full body including quoted text (request ID may be in quoted section).
+        # first_part is the MIME header + content of part 1, so it parses as a message.
+        body = self._extract_body(email.message_from_bytes(first_part))
 
-        # Try to find request ID anywhere in body + subject
-        request_id = self._extract_request_id(body + " " + subject)
+        # Try to find request ID in subject (short) first, then the full body
+        request_id = self._extract_request_id(subject) or self._extract_request_id(body)
 
         if not request_id:
             print(f"[Email] ⚠️  No request ID found in email from {sender} | subject: {subject[:60]}")
@@ -196,9 +365,9 @@ class EmailClient:
                     # Fallback to HTML if no plain text found
                     charset = part.get_content_charset() or "utf-8"
                     try:
-                        html = part.get_payload(decode=True).decode(charset, errors="replace")
+                        html_text = part.get_payload(decode=True).decode(charset, errors="replace")
                         # Strip HTML tags roughly to get text
-                        text = re.sub(r"<[^>]+>", " ", html)
+                        text = _HTML_TAG.sub(" ", html_text)
                         body_parts.append(text)
                     except Exception:
                         pass
@@ -219,18 +388,24 @@ class EmailClient:
         if not text:
             return None
 
+        # Every pattern needs "req_" / "req-" — skip the regexes on unrelated mail
+        if "req_" not in text:
+            lowered = text.lower()
+            if "req_" not in lowered and "req-" not in lowered:
+                return None
+
         # Pattern 1: exact format  [Request ID: req_abc123]
-        match = re.search(r"\[Request\s+ID:\s*(req_[\w\-]+)\]", text, re.IGNORECASE)
+        match = _RID_BRACKET.search(text)
         if match:
             return match.group(1)
 
         # Pattern 2: just the ID on its own line  req_abc123
-        match = re.search(r"\b(req_[\w\-]+)\b", text)
+        match = _RID_BARE.search(text)
         if match:
             return match.group(1)
 
         # Pattern 3: URL-encoded or broken across lines
-        match = re.search(r"req[_\-]([\w\-]+)", text, re.IGNORECASE)
+        match = _RID_LOOSE.search(text)
         if match:
             return "req_" + match.group(1)
 
@@ -238,22 +413,28 @@ class EmailClient:
 
     def _plain_to_html(self, text: str) -> str:
         """Convert plain text email to basic HTML."""
-        lines = text.split("\n")
-        html_lines = []
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith("•"):
-                html_lines.append(f"<li>{stripped[1:].strip()}</li>")
-            elif stripped == "":
-                html_lines.append("<br>")
-            else:
-                html_lines.append(f"<p>{stripped}</p>")
-        return f"""
+        return _plain_to_html(text)
+
+
+@lru_cache(maxsize=128)
+def _plain_to_html(text: str) -> str:
+    """Convert plain text email to basic HTML (cached — bodies come from a few templates)."""
+    body = "".join(map(_wrap_line, text.split("\n")))
+    return f"""
 <html><body style="font-family: Arial, sans-serif; font-size: 14px; color: #333; max-width: 600px;">
-{''.join(html_lines)}
+{body}
 </body></html>"""
 
 
+def _wrap_line(line: str) -> str:
+    stripped = line.strip()
+    if not stripped:
+        return "<br>"
+    if stripped[0] == "•":
+        return f"<li>{html.escape(stripped[1:].strip())}</li>"
+    return f"<p>{html.escape(stripped)}</p>"
+
+
 # ─────────────────────────────────────────
 # Configuration presets
 # ─────────────────────────────────────────
@@ -5,6 +5,19 @@ Used by the agent to parse natural language availability from emails.
 
 import os
 import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Imported once at module load — anthropic pulls in httpx/pydantic and is slow to import
+try:
+    import anthropic
+    _ANTHROPIC_OK = True
+except ImportError:
+    anthropic = None
+    _ANTHROPIC_OK = False
 
 
 class LLMClient:
@@ -13,32 +26,165 @@ class LLMClient:
     Supports mock mode for testing without API key.
     """
 
+    CACHE_MAXSIZE = 512
+    CACHE_TTL_SECONDS = 600
+
     def __init__(self, api_key: str = None, model: str = "claude-haiku-4-5-20251001"):
         self.api_key = api_key or os.environ.get("API_KEY")
         self.model = model
         self._client = None
+        # One AsyncAnthropic per event loop — its httpx pool is bound to the loop it was opened in
+        self._aclients: dict[asyncio.AbstractEventLoop, object] = {}
+        self._aclient_lock = threading.Lock()
+
+        # LRU of {blake2b(model, temperature, prompt): (timestamp, response)} — repeat parses skip the API
+        self._resp_cache: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+        self._cache_lock = threading.Lock()
 
-        if self.api_key:
-            try:
-                import {anthropic}
-                self._client = anthropic.Anthropic(api_key=self.api_key)
-                print(f"[LLM] Using Claude {model}")
-            except ImportError:
-                print("[LLM] anthropic package not found. Using mock mode.")
+        if self.api_key and _ANTHROPIC_OK:
+            self._client = anthropic.Anthropic(api_key=self.api_key)
+            print(f"[LLM] Using Claude {model}")
+        elif self.api_key:
+            print("[LLM] anthropic package not found. Using mock mode.")
         else:
             print("[LLM] No API key found. Using mock mode.")
 
-    def complete(self, prompt: str, max_tokens: int = 1024) -> str:
+    def complete(self, prompt: str, max_tokens: int = 1024, cache: bool = True,
+                 temperature: float = None, system: str = None, tool: dict = None) -> str:
+        """
+        Complete a single user prompt, with an optional `system` prompt.
+        With a `tool` spec the model is forced to call it, and the tool input
+        is returned as a JSON string.
+        """
+        # Only greedy (temperature=0) outputs are cached — a stored draw would pin every later call.
+        # None leaves the API default (1.0), which is sampled too.
+        cache = cache and temperature == 0
+        key = self._cache_key(prompt, max_tokens, temperature, system, tool)
+        if cache:
+            hit = self._cache_get(key)
+            if hit is not None:
+                return hit
+
+        if self._client is None:
+            text = self._mock_complete(prompt)
+        else:
+            message = self._client.messages.create(
+                model=self.model,
+                max_tokens=max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+                **self._request_options(temperature, system, tool),
+            )
+            text = self._message_text(message, tool)
+
+        if cache:
+            self._cache_put(key, text)
+        return text
+
+    async def complete_async(self, prompt: str, max_tokens: int = 1024, cache: bool = True,
+                             temperature: float = None, system: str = None, tool: dict = None) -> str:
+        """Async form of complete, on the running loop's shared AsyncAnthropic (see aclose)."""
+        cache = cache and temperature == 0
+        key = self._cache_key(prompt, max_tokens, temperature, system, tool)
+        if cache:
+            hit = self._cache_get(key)
+            if hit is not None:
+                return hit
+
         if self._client is None:
-            return self._mock_complete(prompt)
+            text = self._mock_complete(prompt)
+        else:
+            message = await self._get_aclient().messages.create(
+                model=self.model,
+                max_tokens=max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+                **self._request_options(temperature, system, tool),
+            )
+            text = self._message_text(message, tool)
 
-        message = self._client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            messages=[{"role": "user", "content": prompt}],
-        )
+        if cache:
+            self._cache_put(key, text)
+        return text
+
+    async def complete_many(self, prompts: list[str], concurrency: int = 5, max_tokens: int = 1024,
+                            temperature: float = None, system: str = None, tool: dict = None) -> list[str]:
+        """Complete several prompts concurrently (at most `concurrency` in flight), preserving order."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(prompt: str) -> str:
+            async with semaphore:
+                return await self.complete_async(prompt, max_tokens=max_tokens, temperature=temperature,
+                                                 system=system, tool=tool)
+
+        return await asyncio.gather(*(bounded(p) for p in prompts))
+
+    def _get_aclient(self):
+        """The running loop's AsyncAnthropic, opened on first use and kept until aclose()."""
+        loop = asyncio.get_running_loop()
+        with self._aclient_lock:
+            aclient = self._aclients.get(loop)
+            if aclient is None:
+                aclient = self._aclients[loop] = anthropic.AsyncAnthropic(api_key=self.api_key)
+        return aclient
+
+    async def aclose(self):
+        """Close the running loop's AsyncAnthropic, if one was opened. Call before the loop ends."""
+        with self._aclient_lock:
+            aclient = self._aclients.pop(asyncio.get_running_loop(), None)
+        if aclient is not None:
+            await aclient.close()
+
+    @staticmethod
+    def _request_options(temperature: float = None, system: str = None, tool: dict = None) -> dict:
+        options = {}
+        if temperature is not None:
+            options["temperature"] = temperature
+        if system:
+            # No cache_control marker: the agent's system prompt plus tool spec is far below the
+            # provider's minimum cacheable prefix, so marking it would never produce a cache hit
+            options["system"] = system
+        if tool:
+            options["tools"] = [tool]
+            options["tool_choice"] = {"type": "tool", "name": tool["name"]}
+        return options
+
+    @staticmethod
+    def _message_text(message, tool: dict = None) -> str:
+        if tool:
+            for block in message.content:
+                if block.type == "tool_use":
+                    return json.dumps(block.input)
         return message.content[0].text
 
+    # ─────────────────────────────────────────
+    # Response cache
+    # ─────────────────────────────────────────
+    def _cache_key(self, prompt: str, max_tokens: int, temperature: float = None, system: str = None,
+                   tool: dict = None) -> bytes:
+        # Whitespace-only differences (indentation, trailing newlines) share an entry
+        normalized = " ".join(prompt.split())
+        # The whole spec, not just its name — a changed schema must not serve old answers
+        tool_spec = json.dumps(tool, sort_keys=True) if tool else None
+        raw = f"{self.model}|{temperature}|{max_tokens}|{tool_spec}|{system}|{normalized}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+    def _cache_get(self, key: bytes):
+        with self._cache_lock:
+            entry = self._resp_cache.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.CACHE_TTL_SECONDS:
+                del self._resp_cache[key]
+                return None
+            self._resp_cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_put(self, key: bytes, text: str):
+        with self._cache_lock:
+            self._resp_cache[key] = (time.monotonic(), text)
+            self._resp_cache.move_to_end(key)
+            while len(self._resp_cache) > self.CACHE_MAXSIZE:
+                self._resp_cache.popitem(last=False)
+
     def _mock_complete(self, prompt: str) -> str:
         """Return realistic mock responses for testing."""
         prompt_lower = prompt.lower()
@@ -8,10 +8,17 @@ Run: python main.py
 
 
 ""
-import time
+import asyncio
+import logging
+import queue
+import textwrap
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from collections import deque
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from time import monotonic, time
 from typing import Optional
 
 import sys
@@ -19,10 +26,14 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from scheduler_agent import SchedulerAgent
-from calendar_client import MockCalendarClient
-from email_client import EmailClient  
+from calendar_client import CachedCalendarClient, MockCalendarClient
+from email_client import EmailClient, gmail_config
 from llm_client import LLMClient
 
+# Gmail credentials for the demo — read once from the environment, no defaults
+GMAIL_USER = os.environ.get("GMAIL_USER", "")
+GMAIL_APP_PW = os.environ.get("GMAIL_APP_PW", "")
+
 
 
 
@@ -30,7 +41,7 @@ from llm_client import LLMClient
 # Fake Email dataclass (shared by both clients)
 # ─────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FakeEmail:
     sender: str
     subject: str
@@ -39,6 +50,65 @@ class FakeEmail:
     received_at: datetime
 
 
+# Poller / reply / agent status lines. Worker threads only enqueue records; one
+# listener thread formats them and writes to stdout (see _start_logging).
+log = logging.getLogger("ping_schedule.demo")
+_LOGGERS = (log, logging.getLogger("scheduler_agent"))
+
+
+def _start_logging() -> QueueListener:
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    handler = QueueHandler(log_queue)
+    for logger in _LOGGERS:
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    listener.start()
+    return listener
+
+
+def _stop_logging(listener: QueueListener):
+    """Flush and stop the listener, and detach the QueueHandler feeding it."""
+    listener.stop()
+    for logger in _LOGGERS:
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+                logger.removeHandler(handler)
+
+
+# Console banners, built once
+_BANNER = "🤖 " * 20
+_RULE = "=" * 60
+_SUBRULE = "─" * 60
+
+
+# (epoch second, ISO string) — send timestamps are second-precision, so format once per second
+_sent_at_cache = (None, "")
+
+
+def _now_iso() -> str:
+    global _sent_at_cache
+    second = int(time())
+    if _sent_at_cache[0] != second:
+        _sent_at_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _sent_at_cache[1]
+
+
+# Put on a pending_replies queue to wake its poller without delivering a reply
+_WAKE = object()
+
+
+def _drain(q: queue.Queue) -> list:
+    """Take everything currently on the queue without blocking."""
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
+
+
 # ─────────────────────────────────────────
 # Mock Email Client for Demo
 # ─────────────────────────────────────────
@@ -47,8 +117,8 @@ class MockEmailClient:
     """Simulates email sending/receiving for demo purposes."""
 
     def __init__(self):
-        self.sent_emails = []
-        self.pending_replies = []
+        self.sent_emails = deque(maxlen=1000)  # recent sends only — bodies aren't kept forever
+        self.pending_replies = queue.Queue()  # consumed by EmailPollingService
 
     def send(self, to: str, subject: str, body: str, reply_to: str = None):
         email_record = {
@@ -56,36 +126,32 @@ class MockEmailClient:
             "subject": subject,
             "body": body,
             "reply_to": reply_to,
-            "sent_at": datetime.now().isoformat(),
+            "sent_at": _now_iso(),
         }
         self.sent_emails.append(email_record)
-        print(f"\n{'='*60}")
-        print(f"📧 EMAIL SENT")
-        print(f"   To:      {to}")
-        print(f"   Subject: {subject}")
-        print(f"   Body:\n{self._indent(body)}")
-        print(f"{'='*60}")
+        # One write per email — concurrent sends don't interleave and stdout is locked once
+        indented = textwrap.indent(body, '   ', lambda line: True)
+        sys.stdout.write(
+            f"\n{_RULE}\n📧 EMAIL SENT\n   To:      {to}\n   Subject: {subject}\n"
+            f"   Body:\n{indented}\n{_RULE}\n"
+        )
+        sys.stdout.flush()
 
     def fetch_new_replies(self):
         """Return and clear pending simulated replies."""
-        replies = self.pending_replies.copy()
-        self.pending_replies.clear()
-        return replies
+        return _drain(self.pending_replies)
 
     def simulate_reply(self, sender: str, body: str, request_id: str):
         """Inject a simulated reply for testing."""
-        self.pending_replies.append(FakeEmail(
+        self.pending_replies.put(FakeEmail(
             sender=sender,
             subject="Re: Interview Scheduling",
-            body=body + f"\n\n[Request ID: {request_id}]",
+            body=body,
             request_id=request_id,
             received_at=datetime.now(),
         ))
         preview = body[:80] + "..." if len(body) > 80 else body
-        print(f"\n📨 SIMULATED REPLY from {sender}: \"{preview}\"")
-
-    def _indent(self, text: str, indent: str = "   ") -> str:
-        return "\n".join(indent + line for line in text.split("\n"))
+        log.info('\n📨 SIMULATED REPLY from %s: "%s"', sender, preview)
 
 
 # ─────────────────────────────────────────
@@ -101,59 +167,70 @@ class RealEmailClientWithSimulate:
 
     def __init__(self, real_client):
         self._real = real_client
-        self.sent_emails = []
-        self.pending_replies = []   # holds injected FakeEmail objects
+        self.sent_emails = deque(maxlen=1000)
+        self.pending_replies = queue.Queue()   # injected FakeEmails + real inbox replies
 
     def send(self, to: str, subject: str, body: str, reply_to: str = None):
         """Delegates to real client for actual sending."""
         result = self._real.send(to=to, subject=subject, body=body, reply_to=reply_to)
         self.sent_emails.append({"to": to, "subject": subject})
-        print(f"\n{'='*60}")
-        print(f"📧 REAL EMAIL SENT")
-        print(f"   To:      {to}")
-        print(f"   Subject: {subject}")
-        print(f"{'='*60}")
+        sys.stdout.write(f"\n{_RULE}\n📧 REAL EMAIL SENT\n   To:      {to}\n   Subject: {subject}\n{_RULE}\n")
+        sys.stdout.flush()
         return result
 
     def fetch_new_replies(self):
         """
-        Returns any simulated (injected) replies first.
-        Then also checks real inbox via the underlying client (if supported).
+        Returns replies queued so far — simulated ones plus whatever
+        the inbox fetcher thread has pulled from the real inbox.
         """
-        replies = self.pending_replies.copy()
-        self.pending_replies.clear()
+        return _drain(self.pending_replies)
 
-        # Also fetch real replies if underlying client supports it
-        if hasattr(self._real, "fetch_new_replies"):
-            try:
-                real_replies = self._real.fetch_new_replies()
-                replies.extend(real_replies)
-            except Exception as e:
-                print(f"[EmailClient] fetch_new_replies error (non-fatal): {e}")
-
-        return replies
+    def start_inbox_fetcher(self, interval: float, stop: threading.Event):
+        """
+        Poll the real inbox on a background thread and push replies onto
+        pending_replies, so consumers only wake when there is work.
+        """
+        if not hasattr(self._real, "fetch_new_replies"):
+            return None
+
+        def fetch_loop():
+            while not stop.is_set():
+                try:
+                    for reply in self._real.fetch_new_replies():
+                        self.pending_replies.put(reply)
+                except Exception as e:
+                    log.warning("[EmailClient] fetch_new_replies error (non-fatal): %s", e)
+                stop.wait(interval)
+
+        thread = threading.Thread(target=fetch_loop, daemon=True)
+        thread.start()
+        return thread
 
     def simulate_reply(self, sender: str, body: str, request_id: str):
         """
         Injects a fake reply into the polling queue.
         This is what was MISSING — now it works with real EmailClient too.
         """
-        self.pending_replies.append(FakeEmail(
+        self.pending_replies.put(FakeEmail(
             sender=sender,
             subject="Re: Interview Scheduling",
-            body=body + f"\n\n[Request ID: {request_id}]",
+            body=body,
             request_id=request_id,
             received_at=datetime.now(),
         ))
         preview = body[:80] + "..." if len(body) > 80 else body
-        print(f"\n📨 SIMULATED REPLY from {sender}: \"{preview}\"")
+        log.info('\n📨 SIMULATED REPLY from %s: "%s"', sender, preview)
 
     def __getattr__(self, name):
         """
         Fallback: any other method/attribute not defined above
         is forwarded to the real client transparently.
+        Public methods are cached on the wrapper so later lookups skip this hook.
         """
-        return getattr(self._real, name)
+        value = getattr(self._real, name)
+        if not name.startswith("_") and callable(value):
+            object.__setattr__(self, name, value)
+        return value
 
 
 # ─────────────────────────────────────────
@@ -166,62 +243,180 @@ class EmailPollingService:
     In production: runs as a background thread or cron job.
     """
 
-    def __init__(self, agent: SchedulerAgent, email_client, poll_interval: int = 30):
+    def __init__(self, agent: SchedulerAgent, email_client, poll_interval: int = 30, max_workers: int = 8,
+                 debounce_ms: int = 500):
         self.agent = agent
         self.email = email_client
         self.poll_interval = poll_interval
+        self.debounce_ms = debounce_ms
         self._stop = threading.Event()
+        # Replies held back per request until debounce_ms passes without another one
+        self._pending_by_rid: dict[str, list] = {}
+        self._flush_deadline: dict[str, float] = {}
+        # Booking + confirmation emails for different requests run in parallel here
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reply-")
+        self._thread: Optional[threading.Thread] = None
 
     def start(self):
-        thread = threading.Thread(target=self._poll_loop, daemon=True)
-        thread.start()
-        print(f"[Poller] Started — polling every {self.poll_interval}s")
-        return thread
+        # Real inbox is fetched on its own thread every poll_interval;
+        # the poller only wakes when a reply lands on the queue
+        if hasattr(self.email, "start_inbox_fetcher"):
+            self.email.start_inbox_fetcher(self.poll_interval, self._stop)
+        self._thread = threading.Thread(target=asyncio.run, args=(self._poll_loop(),), daemon=True)
+        self._thread.start()
+        log.info("[Poller] Started — inbox fetched every %ss", self.poll_interval)
+        return self._thread
 
     def stop(self):
         self._stop.set()
-
-    def _poll_loop(self):
-        while not self._stop.is_set():
-            self._check_inbox()
-            self._stop.wait(self.poll_interval)
-
-    def _check_inbox(self):
-        replies = self.email.fetch_new_replies()
+        # Wake a _next_batch blocked on the queue so the loop exits now, not after its timeout
+        self.email.pending_replies.put(_WAKE)
+        # The poller submits to the pool until its last batch is dispatched,
+        # so it must be finished before the pool is shut down
+        if self._thread is not None:
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    async def _poll_loop(self):
+        # One event loop for the poller's lifetime, so the LLM client's AsyncAnthropic
+        # for this loop keeps its connection pool across batches; closed on stop
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._stop.is_set():
+                replies = await loop.run_in_executor(None, self._next_batch)
+                if replies:
+                    await self._dispatch(replies)
+            # Stopping: dispatch what is still queued or held back by the debounce
+            replies = self._next_batch(flush=True)
+            if replies:
+                await self._dispatch(replies)
+        finally:
+            await self.agent.llm.aclose()
+
+    def _next_batch(self, flush: bool = False) -> list:
+        """
+        Block up to 1s (or until the next debounce deadline) for replies, then
+        return those ready to dispatch. Quick follow-ups to the same request
+        are coalesced into one reply so the LLM parses them in a single call.
+        With flush, nothing is waited for and every held-back reply is returned.
+        """
+        timeout = 1.0
+        if flush:
+            timeout = 0.0
+        elif self._flush_deadline:
+            timeout = max(0.0, min(self._flush_deadline.values()) - monotonic())
+        try:
+            arrived = [self.email.pending_replies.get(timeout=timeout)]
+            arrived.extend(self.email.fetch_new_replies())
+        except queue.Empty:
+            arrived = []
+        arrived = [r for r in arrived if r is not _WAKE]
+
+        now = monotonic()
+        ready = []
+        for reply in arrived:
+            if not reply.request_id or self.debounce_ms <= 0:
+                ready.append(reply)
+                continue
+            self._pending_by_rid.setdefault(reply.request_id, []).append(reply)
+            self._flush_deadline[reply.request_id] = now + self.debounce_ms / 1000
+
+        for rid, deadline in list(self._flush_deadline.items()):
+            if flush or deadline <= now:
+                del self._flush_deadline[rid]
+                ready.append(self._coalesce(self._pending_by_rid.pop(rid)))
+        return ready
+
+    @staticmethod
+    def _coalesce(replies: list):
+        if len(replies) == 1:
+            return replies[0]
+        log.info("[Poller] Coalesced %d replies for request %s", len(replies), replies[-1].request_id)
+        return replace(replies[-1], body="\n---\n".join(r.body for r in replies))
+
+    async def _dispatch(self, replies: list):
+        routable = []
         for reply in replies:
             if reply.request_id:
-                print(f"\n[Poller] Routing reply from {reply.sender} → request {reply.request_id}")
-                result = self.agent.handle_email_reply(
-                    request_id=reply.request_id,
-                    sender=reply.sender,
-                    email_body=reply.body,
-                )
-                print(f"[Poller] Agent result: {result}")
+                log.info("\n[Poller] Routing reply from %s → request %s", reply.sender, reply.request_id)
+                routable.append((reply.request_id, reply.sender, reply.body))
             else:
-                print(f"[Poller] ⚠️  No request ID from {reply.sender} — skipping")
+                log.warning("[Poller] ⚠️  No request ID from %s — skipping", reply.sender)
+
+        # One batch per poll so the LLM parses all replies concurrently
+        if routable:
+            for result in await self.agent.handle_email_replies_async(routable, executor=self._pool):
+                log.info("[Poller] Agent result: %s", result)
 
 
 # ─────────────────────────────────────────
 # Demo Scenarios
 # ─────────────────────────────────────────
 
+DEMO_SCENARIOS = [
+    {
+        "title": "Successful interview scheduling",
+        "init": dict(
+            recruiter_email="dedeepyabitra6@gmail.com",
+            candidate_email="vepadanandini123@gmail.com",
+            job_title="Senior Software Engineer",
+            duration_minutes=60,
+        ),
+        # Candidate replies with availability
+        "reply": dict(
+            sender="vepadanandini123@gmail.com",
+            body="I'm available Monday at 10am or Tuesday at 2pm next week.",
+        ),
+    },
+    {
+        "title": "No overlap — agent finds alternative slots",
+        "init": dict(
+            recruiter_email="dedeepyabitra6@gmail.com",
+            candidate_email="vepadanandini123@gmail.com",
+            job_title="Product Manager",
+            duration_minutes=45,
+        ),
+        # Candidate offers times that don't overlap with recruiter's mock slots
+        "reply": dict(
+            sender="vepadanandini123@gmail.com",
+            body="I'm only free Saturday morning or Sunday afternoon this week.",
+        ),
+    },
+    {
+        "title": "Candidate declines interview",
+        "init": dict(
+            recruiter_email="dedeepyabitra6@gmail.com",
+            candidate_email="himabindubojanapu12@gmail.com",   # fixed typo: .co → .com
+            job_title="Data Scientist",
+            duration_minutes=60,
+        ),
+        "reply": dict(
+            sender="himabindubojanapu12@gmail.com",
+            body="Thank you for the opportunity, but I would like to withdraw my application.",
+        ),
+    },
+]
+
+
 def run_demo():
-    print("\n" + "🤖 " * 20)
+    if not (GMAIL_USER and GMAIL_APP_PW):
+        sys.exit("Set GMAIL_USER and GMAIL_APP_PW to run the demo.")
+
+    listener = _start_logging()
+    print("\n" + _BANNER)
     print("   INTERVIEW SCHEDULING AGENT — DEMO")
-    print("🤖 " * 20 + "\n")
+    print(_BANNER + "\n")
 
     # ── Initialize real email client and WRAP it ──
-    from email_client import EmailClient, gmail_config
-
     raw_email_client = EmailClient(gmail_config(
-        username="dedeepyabitra6@gmail.com",
-        app_password="nwzh evit gcry fafm"
+        username=GMAIL_USER,
+        app_password=GMAIL_APP_PW,
     ))
 
     # THIS is the fix — wrap it so simulate_reply() works
     email_client = RealEmailClientWithSimulate(raw_email_client)
 
-    calendar_client = MockCalendarClient()
+    calendar_client = CachedCalendarClient(MockCalendarClient())
     llm_client = LLMClient()
 
     agent = SchedulerAgent(
@@ -234,90 +429,35 @@ def run_demo():
     poller = EmailPollingService(agent, email_client, poll_interval=2)
     poller.start()
 
-    # ── SCENARIO 1: Successful scheduling ──
-    print("\n" + "─" * 60)
-    print("SCENARIO 1: Successful interview scheduling")
-    print("─" * 60)
-
-    request_id, request = agent.initiate_scheduling(
-        recruiter_email="dedeepyabitra6@gmail.com",
-        candidate_email="vepadanandini123@gmail.com",
-        job_title="Senior Software Engineer",
-        duration_minutes=60,
-    )
-
-    time.sleep(0.5)
-
-    # Simulate candidate replying with availability
-    email_client.simulate_reply(
-        sender="vepadanandini123@gmail.com",
-        body="I'm available Monday at 10am or Tuesday at 2pm next week.",
-        request_id=request_id,
-    )
-
-    time.sleep(3)  # Let poller process
-
-    print(f"\n[Demo] Scenario 1 status: {agent.active_requests[request_id].status}")
+    def run_scenario(scenario: dict):
+        request_id, _ = agent.initiate_scheduling(**scenario["init"])
+        email_client.simulate_reply(request_id=request_id, **scenario["reply"])
+        agent.wait_for_reply(request_id, timeout=5)  # Let poller process
+        return request_id
 
-    # ── SCENARIO 2: No overlap, retry ──
-    print("\n" + "─" * 60)
-    print("SCENARIO 2: No overlap — agent finds alternative slots")
-    print("─" * 60)
-
-    request_id2, request2 = agent.initiate_scheduling(
-        recruiter_email="dedeepyabitra6@gmail.com",
-        candidate_email="vepadanandini123@gmail.com",
-        job_title="Product Manager",
-        duration_minutes=45,
-    )
-
-    time.sleep(0.5)
-
-    # Candidate offers times that don't overlap with recruiter's mock slots
-    email_client.simulate_reply(
-        sender="vepadanandini123@gmail.com",
-        body="I'm only free Saturday morning or Sunday afternoon this week.",
-        request_id=request_id2,
-    )
-
-    time.sleep(3)
-
-    print(f"\n[Demo] Scenario 2 status: {agent.active_requests[request_id2].status}")
-
-    # ── SCENARIO 3: Candidate declines ──
-    print("\n" + "─" * 60)
-    print("SCENARIO 3: Candidate declines interview")
-    print("─" * 60)
-
-    request_id3, request3 = agent.initiate_scheduling(
-        recruiter_email="dedeepyabitra6@gmail.com",
-        candidate_email="himabindubojanapu12@gmail.com",   # fixed typo: .co → .com
-        job_title="Data Scientist",
-        duration_minutes=60,
-    )
-
-    time.sleep(0.5)
-
-    email_client.simulate_reply(
-        sender="himabindubojanapu12@gmail.com",
-        body="Thank you for the opportunity, but I would like to withdraw my application.",
-        request_id=request_id3,
-    )
+    # Scenarios use independent request IDs, so run them side by side
+    print("\n" + _SUBRULE)
+    for i, scenario in enumerate(DEMO_SCENARIOS, 1):
+        print(f"SCENARIO {i}: {scenario['title']}")
+    print(_SUBRULE)
 
-    time.sleep(3)
+    with ThreadPoolExecutor(max_workers=len(DEMO_SCENARIOS), thread_name_prefix="scenario-") as pool:
+        request_ids = list(pool.map(run_scenario, DEMO_SCENARIOS))
 
-    print(f"\n[Demo] Scenario 3 status: {agent.active_requests[request_id3].status}")
+    for i, request_id in enumerate(request_ids, 1):
+        print(f"\n[Demo] Scenario {i} status: {agent.active_requests[request_id].status}")
 
     # ── Summary ──
-    print("\n" + "=" * 60)
+    print("\n" + _RULE)
     print("DEMO SUMMARY")
-    print("=" * 60)
+    print(_RULE)
     for rid, req in agent.active_requests.items():
         print(f"  {rid[:30]:<30} | {req.job_title:<30} | Status: {req.status}")
 
     print(f"\n  Total emails sent: {len(email_client.sent_emails)}")
 
     poller.stop()
+    _stop_logging(listener)
     print("\n✅ Demo complete.\n")
 
 
@@ -3,12 +3,26 @@ Interview Scheduling Agent
 Orchestrates email parsing, availability detection, and calendar booking.
 """
 
+import asyncio
+import copy
+import hashlib
 import json
+import logging
 import re
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+from string import Template
+from time import monotonic, time
 from typing import Optional
 from dataclasses import dataclass, field
 
+from calendar_client import CachedCalendarClient
+
 
 def process_candidate_input(self, request_id, candidate_input):
 
@@ -39,6 +53,210 @@ def process_candidate_input(self, request_id, candidate_input):
     # SCENARIO 4: Invalid reply
     return "⚠️ Invalid response. Please choose a valid slot or type 'cancel'."
 
+SLOT_DISPLAY_FORMAT = "%A, %B %d at %I:%M %p"
+SLOT_DISPLAY_LONG_FORMAT = "%A, %B %d, %Y at %I:%M %p"
+
+_log = logging.getLogger("scheduler_agent")
+
+# NumPy is optional — vectorizes overlap matching for large slot lists
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+_EPOCH = datetime(1970, 1, 1)
+_USEC = timedelta(microseconds=1)
+_HOUR_USEC = 3_600_000_000
+_DAY_USEC = 24 * _HOUR_USEC
+
+_JSON_DECODER = json.JSONDecoder()
+
+_TZ_SUFFIX = re.compile(r'[+-]\d{2}:\d{2}$')
+_DT_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_dt_cached(dt_str: str) -> datetime:
+    """Naive datetime for a slot string; the same slot strings are parsed over and over."""
+    try:
+        # C fast path on the raw string — 3.11+ accepts "Z" and offsets directly.
+        # Dropping tzinfo keeps the wall-clock time, same as stripping the suffix.
+        return datetime.fromisoformat(dt_str).replace(tzinfo=None)
+    except ValueError:
+        pass
+    # Older Pythons / odd inputs: remove timezone info for naive comparison
+    dt_str = _TZ_SUFFIX.sub('', dt_str.strip()).replace("Z", "")
+    for fmt in _DT_FORMATS:
+        try:
+            return datetime.strptime(dt_str, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Cannot parse datetime: {dt_str}")
+
+
+@lru_cache(maxsize=4096)
+def _parse_candidate_dt(date_str: str, time_str: str) -> datetime:
+    """datetime for an LLM-extracted date + "HH:MM"; repeat replies carry the same pairs."""
+    return datetime.strptime(f"{date_str}T{time_str}", "%Y-%m-%dT%H:%M")
+
+
+# Fixed instructions for availability extraction. Kept byte-identical across
+# calls (no dates, durations or slots); everything that varies goes in the
+# per-reply user message.
+AVAILABILITY_SYSTEM_PROMPT = """You are an assistant that extracts scheduling information from emails.
+
+The user message lists the recruiter's available slots that were offered to the candidate,
+each with a numeric id in brackets, followed by the interview length, today's date, and
+the candidate's email reply. The candidate is replying to say which time works for them.
+
+Your job: Figure out which of the recruiter's slots the candidate is referring to and
+record it by calling the record_reply tool.
+
+STRICT rules:
+- If candidate says "Monday works" or "Monday at 10am" → find the matching Monday slot in the recruiter's list and put its id in slot_ids
+- If candidate confirms any specific slot → action = "provide_availability" with that slot's id in slot_ids
+- Only use ids shown in the list; never invent one
+- If the candidate proposes a time that is not in the list → describe it in slots with an exact YYYY-MM-DD date
+- If end_time not mentioned → add the interview length to start_time
+- If candidate says they can't make it or wants to withdraw → action = "decline"
+- If candidate asks for different times → action = "request_other_times\""""
+
+# Forced tool call for the extraction — the model answers with offered slot ids
+# instead of restating dates. Ids are plain integers (not a per-request enum) so
+# the spec, like the system prompt, stays byte-identical across calls.
+RECORD_REPLY_TOOL = {
+    "name": "record_reply",
+    "description": "Record what the candidate's reply means for scheduling.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["provide_availability", "confirm", "decline", "request_other_times", "unclear"],
+            },
+            "slot_ids": {
+                "type": "array",
+                "items": {"type": "integer"},
+                "description": "Ids of offered recruiter slots the candidate accepted, best first.",
+            },
+            "slots": {
+                "type": "array",
+                "description": "Times the candidate proposed that are not in the offered list.",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "date": {"type": "string", "description": "YYYY-MM-DD"},
+                        "start_time": {"type": "string", "description": "HH:MM"},
+                        "end_time": {"type": "string", "description": "HH:MM"},
+                        "timezone": {"type": ["string", "null"]},
+                    },
+                    "required": ["date", "start_time"],
+                },
+            },
+            "message": {"type": "string", "description": "Any message to pass along."},
+        },
+        "required": ["action"],
+    },
+}
+
+
+# ─────────────────────────────────────────
+# Email templates — parsed once, filled with Template.substitute per send
+# ─────────────────────────────────────────
+_FIRST_INTRO_TPL = Template("We'd love to schedule your interview for the $job_title position.")
+_RETRY_INTRO = "Thank you for your response! Unfortunately those times don't work. Here are some additional options:"
+
+_AVAILABILITY_TPL = Template("""Hi,
+
+$intro
+
+Please reply with which time works best for you, or suggest an alternative:
+
+$slot_lines
+
+Simply reply to this email with your preferred time — our scheduling assistant will take care of the rest!
+
+Best regards,
+Interview Scheduling Assistant
+
+──────────────────────────────
+[Request ID: $request_id]
+──────────────────────────────""")
+
+_CONFIRM_CANDIDATE_TPL = Template("""Hi,
+
+Great news! Your interview has been successfully scheduled. 🎉
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+  INTERVIEW CONFIRMED
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+  Role     : $job_title
+  Date     : $slot_display
+  Duration : $duration_display$meet_link
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+A calendar invite has been sent to your email. Please accept it to confirm attendance.
+
+Tips for your interview:
+  • Join 5 minutes early
+  • Test your audio/video beforehand
+  • Have your resume handy
+
+Best of luck! We look forward to speaking with you.
+
+Best regards,
+Interview Scheduling Assistant""")
+
+_CONFIRM_RECRUITER_TPL = Template("""Hi,
+
+The interview has been successfully scheduled with the candidate.
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+  INTERVIEW BOOKED
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+  Role      : $job_title
+  Candidate : $candidate_email
+  Date      : $slot_display
+  Duration  : $duration_display$meet_link
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+A calendar invite has been added to your calendar automatically.
+
+Best regards,
+Interview Scheduling Assistant""")
+
+_CANCELLATION_TPL = Template("""Hi,
+
+The candidate has declined the interview request.
+
+  Candidate : $candidate_email
+  Position  : $job_title
+
+Please reach out directly if you'd like to follow up.
+
+Best regards,
+Interview Scheduling Assistant""")
+
+_ESCALATION_TPL = Template("""Hi,
+
+The automated scheduling agent was unable to find a mutually available time.
+
+  Candidate : $candidate_email
+  Position  : $job_title
+
+Please reach out to the candidate directly to schedule the interview.
+
+Best regards,
+Interview Scheduling Assistant""")
+
+
 @dataclass
 class InterviewRequest:
     recruiter_email: str
@@ -47,9 +265,18 @@ class InterviewRequest:
     duration_minutes: int = 60
     conversation_history: list = field(default_factory=list)
     recruiter_slots: list = field(default_factory=list)
+    # Parsed start/end per recruiter_slots entry (None if unparseable), kept index-aligned
+    recruiter_start_dt: list = field(default_factory=list)
+    recruiter_end_dt: list = field(default_factory=list)
+    # Pre-rendered starts: "Monday, March 10 at 10:00 AM" / "Monday, March 10, 2025 at 10:00 AM"
+    recruiter_display: list = field(default_factory=list)
+    recruiter_display_long: list = field(default_factory=list)
+    recruiter_slots_display: str = ""  # slot block for the LLM prompt, re-rendered when slots change
     candidate_slots: list = field(default_factory=list)
     confirmed_slot: Optional[dict] = None
-    status: str = "pending"  # pending | awaiting_candidate | confirmed | cancelled
+    # Display strings offered for free-text selection (process_candidate_input)
+    proposed_slots: list = field(default_factory=list)
+    status: str = "pending"  # pending | awaiting_candidate | confirmed | cancelled | needs_human
 
 
 class SchedulerAgent:
@@ -58,11 +285,36 @@ class SchedulerAgent:
     Uses an LLM for natural language understanding of availability.
     """
 
-    def __init__(self, llm_client, email_client, calendar_client):
+    # needs_human is handed off to the recruiter by email, so the agent holds it no longer than the rest
+    TERMINAL_STATUSES = frozenset({"confirmed", "cancelled", "needs_human"})
+    TERMINAL_RETENTION_SECONDS = 3600  # finished requests stay visible this long, then are purged
+    EXTRACT_CACHE_MAXSIZE = 512
+    MAX_ACTIVE_REQUESTS = 10_000  # oldest requests are evicted past this
+    NUMPY_MIN_PAIRS = 256  # recruiter × candidate pairs before _find_overlap vectorizes
+
+    def __init__(self, llm_client, email_client, calendar_client, calendar_cache_ttl: int = 60):
         self.llm = llm_client
         self.email = email_client
+        # Concurrent requests for one recruiter share availability lookups for
+        # calendar_cache_ttl seconds; booking drops the attendees' entries. 0 disables.
+        if calendar_cache_ttl and not isinstance(calendar_client, CachedCalendarClient):
+            calendar_client = CachedCalendarClient(calendar_client, ttl_seconds=calendar_cache_ttl)
         self.calendar = calendar_client
-        self.active_requests: dict[str, InterviewRequest] = {}
+        # Insertion-ordered, so the oldest request is always at the head
+        self.active_requests: OrderedDict[str, InterviewRequest] = OrderedDict()
+        # Set once a reply for the request has been fully handled
+        self._reply_handled: dict[str, threading.Event] = {}
+        self._id_lock = threading.Lock()  # requests may be initiated from several threads
+        # (purge_at, request_id) for finished requests, oldest first
+        self._retired: deque[tuple[float, str]] = deque()
+        # LRU of parsed LLM extractions, keyed on (reply text, offered slots, duration, today).
+        # Unlike the llm_client's text cache, a hit here skips building the prompt and
+        # parsing the JSON, matches replies case-insensitively, and works with any
+        # llm_client, including one without a response cache.
+        self._extract_cache: OrderedDict[bytes, dict] = OrderedDict()
+        self._extract_lock = threading.Lock()
+        # Independent emails (candidate + recruiter confirmations) go out concurrently
+        self._email_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-email-")
 
     # ─────────────────────────────────────────
     # Entry point: Recruiter kicks off scheduling
@@ -80,8 +332,17 @@ class SchedulerAgent:
             job_title=job_title,
             duration_minutes=duration_minutes,
         )
-        request_id = f"req_{datetime.now().strftime('%Y%m%d%H%M%S')}_{candidate_email.split('@')[0]}"
-        self.active_requests[request_id] = request
+        # Epoch seconds keep IDs roughly sortable; the random suffix makes same-second IDs distinct
+        request_id = f"req_{int(time())}_{uuid.uuid4().hex[:8]}"
+        with self._id_lock:
+            self._purge_retired()
+            self.active_requests[request_id] = request
+            self._reply_handled[request_id] = threading.Event()
+            while len(self.active_requests) > self.MAX_ACTIVE_REQUESTS:
+                evicted_id, evicted = self.active_requests.popitem(last=False)
+                self._reply_handled.pop(evicted_id, None)
+                _log.warning("[Agent] ⚠️ Evicted oldest request %s (%s) — over %d active",
+                             evicted_id, evicted.status, self.MAX_ACTIVE_REQUESTS)
 
         # Step 1: Check recruiter's calendar for open slots
         recruiter_slots = self.calendar.get_available_slots(
@@ -89,13 +350,13 @@ class SchedulerAgent:
             duration_minutes=duration_minutes,
             days_ahead=14,
         )
-        request.recruiter_slots = recruiter_slots
+        self._add_recruiter_slots(request, recruiter_slots)
 
         # Step 2: Email candidate with available times
-        self._send_availability_request(request_id, request, recruiter_slots)
+        self._send_availability_request(request_id, request)
         request.status = "awaiting_candidate"
 
-        print(f"[Agent] Scheduling initiated for {candidate_email} | Request: {request_id}")
+        _log.info("[Agent] Scheduling initiated for %s | Request: %s", candidate_email, request_id)
         return request_id, request
 
     # ─────────────────────────────────────────
@@ -108,14 +369,124 @@ class SchedulerAgent:
         request = self.active_requests[request_id]
         request.conversation_history.append({"from": sender, "body": email_body})
 
-        print(f"[Agent] Processing reply from {sender} for request {request_id}")
+        _log.info("[Agent] Processing reply from %s for request %s", sender, request_id)
 
         # Use LLM to extract availability from natural language
         extracted = self._extract_availability_with_llm(email_body, request)
-        print(f"[Agent] LLM extracted action: {extracted.get('action')} | slots: {extracted.get('slots')}")
+        result = self._apply_extracted(request_id, request, extracted)
+        self._retire_if_terminal(request_id, request)
+        self._mark_reply_handled(request_id)
+        return result
+
+    def handle_email_replies(self, replies: list[tuple[str, str, str]]) -> list[dict]:
+        """
+        Batch form of handle_email_reply for (request_id, sender, email_body) tuples.
+        All LLM calls for the batch are issued concurrently; results keep input order.
+        """
+        async def run_batch():
+            try:
+                return await self.handle_email_replies_async(replies)
+            finally:
+                # This loop ends with the batch, so its async LLM client goes with it
+                await self.llm.aclose()
+
+        return asyncio.run(run_batch())
+
+    async def handle_email_replies_async(
+        self, replies: list[tuple[str, str, str]], executor: Executor = None
+    ) -> list[dict]:
+        """
+        handle_email_replies for callers already running an event loop.
+        With an executor, the booking/email work for different requests runs
+        in parallel on it; replies to the same request are still applied in order.
+        """
+        results = [None] * len(replies)
+        pending = []  # (index, request_id, request, prompt)
+        for i, (request_id, sender, email_body) in enumerate(replies):
+            if request_id not in self.active_requests:
+                results[i] = {"status": "error", "message": "Unknown request ID"}
+                continue
+            request = self.active_requests[request_id]
+            request.conversation_history.append({"from": sender, "body": email_body})
+            _log.info("[Agent] Processing reply from %s for request %s", sender, request_id)
+            pending.append((i, request_id, request, self._build_availability_prompt(email_body, request)))
+
+        if not pending:
+            return results
+
+        # Replies already extracted against the same slots skip the LLM
+        keys = [self._extract_key(replies[i][2], request) for i, _, request, _ in pending]
+        extracted_list = [self._extract_cache_get(key) for key in keys]
+        misses = [j for j, extracted in enumerate(extracted_list) if extracted is None]
+        if misses:
+            responses = await self.llm.complete_many(
+                [pending[j][3] for j in misses],
+                temperature=0,
+                system=AVAILABILITY_SYSTEM_PROMPT,
+                tool=RECORD_REPLY_TOOL,
+            )
+            for j, response in zip(misses, responses):
+                extracted_list[j] = self._parse_llm_response(response)
+                self._extract_cache_put(keys[j], extracted_list[j])
+
+        by_request: dict[str, list] = {}
+        for (i, request_id, request, _), extracted in zip(pending, extracted_list):
+            by_request.setdefault(request_id, []).append((i, request, extracted))
+
+        def apply_in_order(request_id: str, items: list):
+            for i, request, extracted in items:
+                results[i] = self._apply_extracted(request_id, request, extracted)
+            self._retire_if_terminal(request_id, request)
+            self._mark_reply_handled(request_id)
+
+        if executor is None:
+            for request_id, items in by_request.items():
+                apply_in_order(request_id, items)
+        else:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, apply_in_order, request_id, items)
+                for request_id, items in by_request.items()
+            ))
+
+        return results
+
+    def wait_for_reply(self, request_id: str, timeout: float = None) -> bool:
+        """Block until a reply for request_id has been handled. Returns False on timeout."""
+        event = self._reply_handled.get(request_id)
+        return event.wait(timeout) if event else False
+
+    def _mark_reply_handled(self, request_id: str):
+        # The request may have been evicted or purged while its reply was being parsed
+        event = self._reply_handled.get(request_id)
+        if event is not None:
+            event.set()
+
+    def _retire_if_terminal(self, request_id: str, request: InterviewRequest):
+        if request.status in self.TERMINAL_STATUSES:
+            self._retired.append((monotonic() + self.TERMINAL_RETENTION_SECONDS, request_id))
+
+    def _purge_retired(self):
+        """Drop finished requests past their retention window. Caller holds _id_lock."""
+        now = monotonic()
+        while self._retired and self._retired[0][0] <= now:
+            _, request_id = self._retired.popleft()
+            request = self.active_requests.get(request_id)
+            if request is not None and request.status in self.TERMINAL_STATUSES:
+                del self.active_requests[request_id]
+                self._reply_handled.pop(request_id, None)
+
+    def _apply_extracted(self, request_id: str, request: InterviewRequest, extracted: dict) -> dict:
+        """Act on the action/slots the LLM extracted from a candidate reply."""
+        _log.debug("[Agent] LLM extracted action: %s | slot_ids: %s | slots: %s",
+                   extracted.get("action"), extracted.get("slot_ids"), extracted.get("slots"))
 
         if extracted["action"] == "provide_availability":
-            return self._process_candidate_availability(request_id, request, extracted["slots"])
+            # Picked straight from the offered list — no date parsing or overlap search needed
+            chosen = self._offered_slots(request, extracted.get("slot_ids"))
+            if chosen:
+                return self._book_slot(request, chosen[0])
+            return self._process_candidate_availability(request_id, request, extracted.get("slots") or [])
 
         elif extracted["action"] == "confirm":
             return self._confirm_booking(request_id, request)
@@ -138,71 +509,77 @@ class SchedulerAgent:
     # LLM: Parse availability from email text
     # ─────────────────────────────────────────
     def _extract_availability_with_llm(self, email_body: str, request: InterviewRequest) -> dict:
-        # Format recruiter slots in human-readable form so LLM can match against them
-        recruiter_slots_display = ""
-        if request.recruiter_slots:
-            lines = []
-            for s in request.recruiter_slots:
-                try:
-                    dt = self._parse_dt(s["start"])
-                    lines.append(f"  - {dt.strftime('%A, %B %d, %Y at %I:%M %p')} | raw: {s['start']}")
-                except Exception:
-                    lines.append(f"  - {s['start']}")
-            recruiter_slots_display = "Recruiter's available slots that were offered to candidate:\n" + "\n".join(lines)
-
-        prompt = f"""You are an assistant that extracts scheduling information from emails.
-
+        key = self._extract_key(email_body, request)
+        extracted = self._extract_cache_get(key)
+        if extracted is None:
+            response = self.llm.complete(
+                self._build_availability_prompt(email_body, request),
+                temperature=0,
+                system=AVAILABILITY_SYSTEM_PROMPT,
+                tool=RECORD_REPLY_TOOL,
+            )
+            extracted = self._parse_llm_response(response)
+            self._extract_cache_put(key, extracted)
+        return extracted
+
+    def _extract_key(self, email_body: str, request: InterviewRequest) -> bytes:
+        # The prompt carries today's date, so relative replies ("next Monday") re-parse daily,
+        # and the interview length, which the LLM uses to fill in missing end times
+        slots = "|".join(s["start"] for s in request.recruiter_slots)
+        raw = (f"{datetime.now().date()}|{request.duration_minutes}|{slots}|"
+               f"{' '.join(email_body.lower().split())}")
+        return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+    def _extract_cache_get(self, key: bytes) -> Optional[dict]:
+        with self._extract_lock:
+            extracted = self._extract_cache.get(key)
+            if extracted is None:
+                return None
+            self._extract_cache.move_to_end(key)
+        # Callers keep the slot dicts, so hand out a copy
+        return copy.deepcopy(extracted)
+
+    def _extract_cache_put(self, key: bytes, extracted: dict):
+        if extracted.get("action") == "unclear":
+            return  # unparseable or ambiguous — let the next identical reply try again
+        with self._extract_lock:
+            self._extract_cache[key] = copy.deepcopy(extracted)
+            if len(self._extract_cache) > self.EXTRACT_CACHE_MAXSIZE:
+                self._extract_cache.popitem(last=False)
+
+    def _build_availability_prompt(self, email_body: str, request: InterviewRequest) -> str:
+        """User message for the availability extraction; pair with AVAILABILITY_SYSTEM_PROMPT."""
+        # Only per-request content here; the fixed instructions live in AVAILABILITY_SYSTEM_PROMPT
+        # Ordered from most to least stable: slots and length are fixed per request,
+        # the date changes daily, the reply every call
+        return f"""{request.recruiter_slots_display}
+
+Interview length: {request.duration_minutes} minutes
 Today's date: {datetime.now().strftime('%A, %B %d, %Y')}
 
-{recruiter_slots_display}
-
 Candidate's email reply:
 \"\"\"
 {email_body}
-\"\"\"
-
-The candidate was previously sent the recruiter's available slots listed above.
-Now they are replying to say which time works for them.
-
-Your job: Figure out which of the recruiter's slots the candidate is referring to and return it.
-
-Return a JSON object:
-{{
-  "action": "provide_availability" | "confirm" | "decline" | "request_other_times" | "unclear",
-  "slots": [
-    {{
-      "date": "YYYY-MM-DD",
-      "start_time": "HH:MM",
-      "end_time": "HH:MM",
-      "timezone": null
-    }}
-  ],
-  "message": "any message to pass along"
-}}
-
-STRICT rules:
-- If candidate says "Monday works" or "Monday at 10am" → find the matching Monday slot from the recruiter's list above and return that exact date in YYYY-MM-DD format
-- If candidate confirms any specific slot → action = "provide_availability" with that slot's exact date and time
-- If end_time not mentioned → add {request.duration_minutes} minutes to start_time
-- If candidate says they can't make it or wants to withdraw → action = "decline"
-- If candidate asks for different times → action = "request_other_times"
-- ALWAYS return the exact YYYY-MM-DD date from the recruiter slots list above, never a vague date
-- Only return valid JSON, no other text."""
+\"\"\""""
 
-        response = self.llm.complete(prompt)
+    def _parse_llm_response(self, response: str) -> dict:
         try:
             # Clean up markdown code blocks if LLM returns them
             clean = response.strip().replace("```json", "").replace("```", "").strip()
             return json.loads(clean)
         except json.JSONDecodeError:
-            # Fallback: try to extract JSON from response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
+            # Fallback: decode the first complete JSON object embedded in the text.
+            # raw_decode stops at the object's closing brace — one linear scan, no regex backtracking.
+            start = response.find("{")
+            while start != -1:
                 try:
-                    return json.loads(json_match.group())
-                except Exception:
+                    obj, _ = _JSON_DECODER.raw_decode(response, start)
+                    if isinstance(obj, dict):
+                        return obj
+                except json.JSONDecodeError:
                     pass
-            print(f"[Agent] ⚠️ LLM response could not be parsed: {response[:200]}")
+                start = response.find("{", start + 1)
+            _log.warning("[Agent] ⚠️ LLM response could not be parsed: %s", response[:200])
             return {"action": "unclear", "slots": [], "message": response}
 
     # ─────────────────────────────────────────
@@ -214,103 +591,215 @@ STRICT rules:
         request.candidate_slots = candidate_slots
 
         if not candidate_slots:
-            print("[Agent] ⚠️ No candidate slots extracted — sending retry email")
+            _log.warning("[Agent] ⚠️ No candidate slots extracted — sending retry email")
             return self._handle_no_overlap(request_id, request)
 
-        overlap = self._find_overlap(request.recruiter_slots, candidate_slots, request.duration_minutes)
-        print(f"[Agent] Overlap check: {len(request.recruiter_slots)} recruiter slots vs {len(candidate_slots)} candidate slots → {len(overlap)} overlaps")
+        overlap = self._find_overlap(request, candidate_slots)
+        _log.debug("[Agent] Overlap check: %d recruiter slots vs %d candidate slots → %d overlaps",
+                   len(request.recruiter_slots), len(candidate_slots), len(overlap))
 
         if overlap:
-            best_slot = overlap[0]
-            request.confirmed_slot = best_slot
-
-            # Book the calendar event
-            event = self.calendar.create_event(
-                title=f"Interview: {request.job_title}",
-                start=best_slot["start"],
-                end=best_slot["end"],
-                attendees=[request.recruiter_email, request.candidate_email],
-                description=f"Interview for {request.job_title} position.\nScheduled by Interview Scheduling Agent.",
-            )
-
-            request.status = "confirmed"
-
-            # Send confirmation emails to BOTH parties
-            self._send_confirmation(request, best_slot, event)
-
-            print(f"[Agent] ✅ Booked: {best_slot['start']} for {request.candidate_email}")
-            return {"status": "confirmed", "slot": best_slot, "calendar_event": event}
+            return self._book_slot(request, overlap[0])
 
         else:
-            print("[Agent] No overlap found — trying alternative slots")
+            _log.info("[Agent] No overlap found — trying alternative slots")
             return self._handle_no_overlap(request_id, request)
 
-    def _find_overlap(
-        self, recruiter_slots: list, candidate_slots: list, duration_minutes: int
-    ) -> list:
+    def _book_slot(self, request: InterviewRequest, best_slot: dict) -> dict:
+        request.confirmed_slot = best_slot
+
+        # Book the calendar event
+        event = self.calendar.create_event(
+            title=f"Interview: {request.job_title}",
+            start=best_slot["start"],
+            end=best_slot["end"],
+            attendees=[request.recruiter_email, request.candidate_email],
+            description=f"Interview for {request.job_title} position.\nScheduled by Interview Scheduling Agent.",
+        )
+
+        request.status = "confirmed"
+
+        # Send confirmation emails to BOTH parties
+        self._send_confirmation(request, best_slot, event)
+
+        _log.info("[Agent] ✅ Booked: %s for %s", best_slot["start"], request.candidate_email)
+        return {"status": "confirmed", "slot": best_slot, "calendar_event": event}
+
+    def _offered_slots(self, request: InterviewRequest, slot_ids) -> list:
+        """Slot dicts for the valid offered-slot ids (indices into recruiter_slots) the LLM picked."""
+        chosen = []
+        for i in slot_ids or ():
+            if isinstance(i, int) and 0 <= i < len(request.recruiter_slots) and request.recruiter_start_dt[i]:
+                chosen.append(self._slot_result(request, i))
+        return chosen
+
+    def _slot_result(self, request: InterviewRequest, i: int) -> dict:
+        return {
+            "start": request.recruiter_start_dt[i].isoformat(),
+            "end": request.recruiter_end_dt[i].isoformat(),
+            "display": request.recruiter_display[i],
+            "display_long": request.recruiter_display_long[i],
+        }
+
+    def _add_recruiter_slots(self, request: InterviewRequest, slots: list):
+        """Append recruiter slots, parsing and rendering their times once for every later use."""
+        for slot in slots:
+            try:
+                start, end = self._parse_dt(slot["start"]), self._parse_dt(slot["end"])
+            except Exception:
+                start = end = None
+            request.recruiter_slots.append(slot)
+            request.recruiter_start_dt.append(start)
+            request.recruiter_end_dt.append(end)
+            request.recruiter_display.append(start and start.strftime(SLOT_DISPLAY_FORMAT))
+            request.recruiter_display_long.append(start and start.strftime(SLOT_DISPLAY_LONG_FORMAT))
+        request.recruiter_slots_display = self._render_slots_block(request)
+
+    def _render_slots_block(self, request: InterviewRequest) -> str:
+        """Recruiter slots in human-readable form so the LLM can match against them."""
+        if not request.recruiter_slots:
+            return ""
+        lines = []
+        for i, (s, display) in enumerate(zip(request.recruiter_slots, request.recruiter_display_long)):
+            if display is not None:
+                lines.append(f"  - [{i}] {display} | raw: {s['start']}")
+            else:
+                # Unparseable slots get no id (they can't be booked by id), but the model
+                # still sees them and can describe one in free-form slots
+                lines.append(f"  - {s['start']}")
+        return "Recruiter's available slots that were offered to candidate:\n" + "\n".join(lines)
+
+    def _find_overlap(self, request: InterviewRequest, candidate_slots: list) -> list:
         """
         Return list of slots that work for both parties.
         Matches by exact date+hour first, then by day-of-week as fallback.
         """
-        overlapping = []
+        duration_minutes = request.duration_minutes
+        min_overlap = timedelta(minutes=duration_minutes)
 
-        for rs in recruiter_slots:
+        # Candidate slots parsed once up front, not once per recruiter slot
+        candidates = []
+        for cs in candidate_slots:
             try:
-                rs_start = self._parse_dt(rs["start"])
-                rs_end = self._parse_dt(rs["end"])
+                cs_start = self._parse_candidate_slot_start(cs)
+                cs_end = self._parse_candidate_slot_end(cs, duration_minutes)
             except Exception as e:
-                print(f"[Agent] Could not parse recruiter slot {rs}: {e}")
+                _log.warning("[Agent] Could not parse candidate slot %s: %s", cs, e)
                 continue
+            candidates.append((cs_start, cs_end, cs_start.date(), cs_start.hour, cs_start.weekday()))
 
-            for cs in candidate_slots:
-                try:
-                    cs_start = self._parse_candidate_slot_start(cs)
-                    cs_end = self._parse_candidate_slot_end(cs, duration_minutes)
-                except Exception as e:
-                    print(f"[Agent] Could not parse candidate slot {cs}: {e}")
-                    continue
-
-                matched = False
-
-                # Match 1: exact date + hour
-                if rs_start.date() == cs_start.date() and rs_start.hour == cs_start.hour:
-                    matched = True
-                    print(f"[Agent] ✓ Exact match: {rs_start.date()} {rs_start.hour}:00")
-
-                # Match 2: same day-of-week + same hour (handles date resolution mismatch)
-                elif rs_start.weekday() == cs_start.weekday() and rs_start.hour == cs_start.hour:
-                    matched = True
-                    print(f"[Agent] ✓ Day-of-week match: {rs_start.strftime('%A')} {rs_start.hour}:00")
-
-                # Match 3: candidate only said day name with no time → match any slot on that day
-                elif rs_start.date() == cs_start.date() and cs_start.hour == 0:
-                    matched = True
-                    print(f"[Agent] ✓ Date-only match: {rs_start.date()}")
-
-                # Match 4: full time range overlap
-                else:
-                    overlap_start = max(rs_start, cs_start)
-                    overlap_end = min(rs_end, cs_end)
-                    if (overlap_end - overlap_start) >= timedelta(minutes=duration_minutes):
-                        matched = True
-                        print(f"[Agent] ✓ Range overlap match")
-
-                if matched:
-                    overlapping.append({
-                        "start": rs_start.isoformat(),
-                        "end": rs_end.isoformat(),
-                        "display": rs_start.strftime("%A, %B %d at %I:%M %p"),
-                    })
-
-        # Remove duplicates
-        seen = set()
-        unique = []
-        for s in overlapping:
-            if s["start"] not in seen:
-                seen.add(s["start"])
-                unique.append(s)
-
-        return unique
+        if NUMPY_AVAILABLE and len(request.recruiter_start_dt) * len(candidates) > self.NUMPY_MIN_PAIRS:
+            matched = self._match_overlap_np(request, candidates, min_overlap)
+        else:
+            matched = self._match_overlap_indexed(request, candidates, min_overlap)
+
+        # Recruiter order, one entry per distinct start — deduped as it is emitted,
+        # on the datetime itself so skipped duplicates never get formatted
+        overlapping = []
+        emitted_starts = set()
+        for i in sorted(matched):
+            rs_start = request.recruiter_start_dt[i]
+            if rs_start in emitted_starts:
+                continue
+            emitted_starts.add(rs_start)
+            overlapping.append(self._slot_result(request, i))
+
+        return overlapping
+
+    def _match_overlap_indexed(self, request: InterviewRequest, candidates: list, min_overlap: timedelta) -> set:
+        """Indices of recruiter slots matching any candidate, via hash lookups and a sorted-start window."""
+        # Hash recruiter slots by the keys the exact matches use, and sort them
+        # by start for range lookups — each candidate then costs a few probes
+        by_date_hour = defaultdict(list)
+        by_weekday_hour = defaultdict(list)
+        by_date = defaultdict(list)
+        by_start = []  # (start, index), sorted
+        longest = timedelta(0)
+        for i, (rs_start, rs_end) in enumerate(zip(request.recruiter_start_dt, request.recruiter_end_dt)):
+            if rs_start is None:
+                _log.warning("[Agent] Could not parse recruiter slot %s", request.recruiter_slots[i])
+                continue
+            by_date_hour[(rs_start.date(), rs_start.hour)].append(i)
+            by_weekday_hour[(rs_start.weekday(), rs_start.hour)].append(i)
+            by_date[rs_start.date()].append(i)
+            by_start.append((rs_start, i))
+            longest = max(longest, rs_end - rs_start)
+        by_start.sort()
+        starts = [start for start, _ in by_start]
+
+        debug = _log.isEnabledFor(logging.DEBUG)  # match lines are skipped entirely unless enabled
+        matched = set()
+        for cs_start, cs_end, cs_date, cs_hour, cs_weekday in candidates:
+            # A recruiter slot is emitted at most once, so stop once every slot has matched
+            if len(matched) == len(by_start):
+                break
+
+            # Match 1: exact date + hour
+            for i in by_date_hour.get((cs_date, cs_hour), ()):
+                if i not in matched:
+                    matched.add(i)
+                    if debug:
+                        _log.debug("[Agent] ✓ Exact match: %s %d:00", cs_date, cs_hour)
+
+            # Match 2: same day-of-week + same hour (handles date resolution mismatch)
+            for i in by_weekday_hour.get((cs_weekday, cs_hour), ()):
+                if i not in matched:
+                    matched.add(i)
+                    if debug:
+                        _log.debug("[Agent] ✓ Day-of-week match: %s %d:00", cs_start.strftime("%A"), cs_hour)
+
+            # Match 3: candidate only said day name with no time → match any slot on that day
+            if cs_hour == 0:
+                for i in by_date.get(cs_date, ()):
+                    if i not in matched:
+                        matched.add(i)
+                        if debug:
+                            _log.debug("[Agent] ✓ Date-only match: %s", cs_date)
+
+            # Match 4: full time range overlap — only slots starting in
+            # [cs_start + duration - longest, cs_end - duration] can fit
+            lo = bisect_left(starts, cs_start + min_overlap - longest)
+            hi = bisect_right(starts, cs_end - min_overlap)
+            for rs_start, i in by_start[lo:hi]:
+                if i not in matched and min(request.recruiter_end_dt[i], cs_end) - max(rs_start, cs_start) >= min_overlap:
+                    matched.add(i)
+                    if debug:
+                        _log.debug("[Agent] ✓ Range overlap match")
+
+        return matched
+
+    def _match_overlap_np(self, request: InterviewRequest, candidates: list, min_overlap: timedelta) -> set:
+        """Same matches as _match_overlap_indexed, as one broadcast over recruiter × candidate arrays."""
+        valid = []
+        for i, rs_start in enumerate(request.recruiter_start_dt):
+            if rs_start is None:
+                _log.warning("[Agent] Could not parse recruiter slot %s", request.recruiter_slots[i])
+            else:
+                valid.append(i)
+        if not valid or not candidates:
+            return set()
+
+        # Naive datetimes as int64 microseconds since 1970-01-01 (a Thursday, weekday 3)
+        rs_start = np.array([(request.recruiter_start_dt[i] - _EPOCH) // _USEC for i in valid], dtype=np.int64)
+        rs_end = np.array([(request.recruiter_end_dt[i] - _EPOCH) // _USEC for i in valid], dtype=np.int64)
+        cs_start = np.array([(c[0] - _EPOCH) // _USEC for c in candidates], dtype=np.int64)
+        cs_end = np.array([(c[1] - _EPOCH) // _USEC for c in candidates], dtype=np.int64)
+
+        rs_day, cs_day = rs_start // _DAY_USEC, cs_start // _DAY_USEC
+        rs_hour, cs_hour = rs_start % _DAY_USEC // _HOUR_USEC, cs_start % _DAY_USEC // _HOUR_USEC
+
+        same_day = rs_day[:, None] == cs_day[None, :]
+        same_hour = rs_hour[:, None] == cs_hour[None, :]
+        # Match 1 (same date + hour) implies Match 2 (same weekday + hour)
+        weekday_hour = ((rs_day[:, None] + 3) % 7 == (cs_day[None, :] + 3) % 7) & same_hour
+        date_only = same_day & (cs_hour[None, :] == 0)
+        ranges = (
+            np.minimum(rs_end[:, None], cs_end[None, :]) - np.maximum(rs_start[:, None], cs_start[None, :])
+        ) >= min_overlap // _USEC
+
+        hits = (weekday_hour | date_only | ranges).any(axis=1)
+        _log.debug("[Agent] Vectorized overlap: %d of %d recruiter slots matched", int(hits.sum()), len(valid))
+        return {valid[k] for k in np.flatnonzero(hits)}
 
     def _parse_candidate_slot_start(self, cs: dict) -> datetime:
         """Parse a candidate slot dict into a start datetime."""
@@ -322,7 +811,7 @@ STRICT rules:
 
         # Handle both "HH:MM" and "HH:MM:SS"
         time_str = time_str[:5]  # take only HH:MM
-        return datetime.strptime(f"{date_str}T{time_str}", "%Y-%m-%dT%H:%M")
+        return _parse_candidate_dt(date_str, time_str)
 
     def _parse_candidate_slot_end(self, cs: dict, duration_minutes: int) -> datetime:
         """Parse end time or derive from start + duration."""
@@ -332,7 +821,7 @@ STRICT rules:
         if end_time_str:
             try:
                 end_time_str = end_time_str[:5]
-                end = datetime.strptime(f"{cs['date']}T{end_time_str}", "%Y-%m-%dT%H:%M")
+                end = _parse_candidate_dt(cs["date"], end_time_str)
                 if end > start:
                     return end
             except Exception:
@@ -342,23 +831,7 @@ STRICT rules:
 
     def _parse_dt(self, dt_str: str) -> datetime:
         """Parse various datetime string formats."""
-        # Remove timezone info for naive comparison
-        dt_str = re.sub(r'[+-]\d{2}:\d{2}$', '', dt_str.strip())
-        dt_str = dt_str.replace("Z", "")
-
-        formats = [
-            "%Y-%m-%dT%H:%M:%S.%f",
-            "%Y-%m-%dT%H:%M:%S",
-            "%Y-%m-%dT%H:%M",
-            "%Y-%m-%d %H:%M:%S",
-            "%Y-%m-%d %H:%M",
-        ]
-        for fmt in formats:
-            try:
-                return datetime.strptime(dt_str, fmt)
-            except ValueError:
-                continue
-        raise ValueError(f"Cannot parse datetime: {dt_str}")
+        return _parse_dt_cached(dt_str)
 
     # ─────────────────────────────────────────
     # Handle no overlap — fetch more recruiter slots
@@ -371,8 +844,9 @@ STRICT rules:
             exclude_slots=request.recruiter_slots,
         )
         if new_slots:
-            request.recruiter_slots.extend(new_slots)
-            self._send_availability_request(request_id, request, new_slots, retry=True)
+            first_new = len(request.recruiter_slots)
+            self._add_recruiter_slots(request, new_slots)
+            self._send_availability_request(request_id, request, first=first_new, retry=True)
             return {"status": "awaiting_candidate", "message": "Sent alternative times"}
         else:
             request.status = "needs_human"
@@ -397,34 +871,21 @@ STRICT rules:
     # Email helpers
     # ─────────────────────────────────────────
     def _send_availability_request(
-        self, request_id: str, request: InterviewRequest, slots: list, retry: bool = False
+        self, request_id: str, request: InterviewRequest, first: int = 0, retry: bool = False
     ):
-        # Format slots in human-readable way
+        """Offer the candidate up to six recruiter slots, starting at index `first`."""
         slot_lines = []
-        for s in slots[:6]:
-            try:
-                dt = self._parse_dt(s["start"])
-                slot_lines.append(f"  • {dt.strftime('%A, %B %d at %I:%M %p')} ({request.duration_minutes} mins)")
-            except Exception:
+        for s, display in zip(request.recruiter_slots[first:first + 6], request.recruiter_display[first:first + 6]):
+            if display is not None:
+                slot_lines.append(f"  • {display} ({request.duration_minutes} mins)")
+            else:
                 slot_lines.append(f"  • {s['start']} – {s['end']}")
 
         subject = f"Interview Scheduling – {request.job_title}"
-        body = f"""Hi,
-
-{"Thank you for your response! Unfortunately those times don't work. Here are some additional options:" if retry else f"We'd love to schedule your interview for the {request.job_title} position."}
-
-Please reply with which time works best for you, or suggest an alternative:
-
-{chr(10).join(slot_lines)}
-
-Simply reply to this email with your preferred time — our scheduling assistant will take care of the rest!
-
-Best regards,
-Interview Scheduling Assistant
-
-──────────────────────────────
-[Request ID: {request_id}]
-──────────────────────────────"""
+        intro = _RETRY_INTRO if retry else _FIRST_INTRO_TPL.substitute(job_title=request.job_title)
+        body = _AVAILABILITY_TPL.substitute(
+            intro=intro, slot_lines="\n".join(slot_lines), request_id=request_id
+        )
 
         self.email.send(
             to=request.candidate_email,
@@ -435,108 +896,61 @@ Interview Scheduling Assistant
     def _send_confirmation(self, request: InterviewRequest, slot: dict, event: dict = None):
         """Send confirmation emails to BOTH candidate and recruiter."""
 
-        # Format the slot nicely
-        try:
-            dt_start = self._parse_dt(slot["start"])
-            dt_end = self._parse_dt(slot["end"])
-            slot_display = dt_start.strftime("%A, %B %d, %Y at %I:%M %p")
-            duration_display = f"{request.duration_minutes} minutes"
-        except Exception:
-            slot_display = slot.get("display", slot["start"])
-            duration_display = f"{request.duration_minutes} minutes"
+        # Slots from _find_overlap carry their rendered date; parse anything else
+        slot_display = slot.get("display_long")
+        if slot_display is None:
+            try:
+                slot_display = self._parse_dt(slot["start"]).strftime(SLOT_DISPLAY_LONG_FORMAT)
+            except Exception:
+                slot_display = slot.get("display", slot["start"])
+        duration_display = f"{request.duration_minutes} minutes"
 
         meet_link = ""
         if event and event.get("meet_link"):
             meet_link = f"\nGoogle Meet Link: {event['meet_link']}"
 
-        # ── Email to CANDIDATE ──
-        candidate_body = f"""Hi,
-
-Great news! Your interview has been successfully scheduled. 🎉
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-  INTERVIEW CONFIRMED
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-  Role     : {request.job_title}
-  Date     : {slot_display}
-  Duration : {duration_display}{meet_link}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-A calendar invite has been sent to your email. Please accept it to confirm attendance.
-
-Tips for your interview:
-  • Join 5 minutes early
-  • Test your audio/video beforehand
-  • Have your resume handy
-
-Best of luck! We look forward to speaking with you.
-
-Best regards,
-Interview Scheduling Assistant"""
+        fields = dict(
+            job_title=request.job_title,
+            candidate_email=request.candidate_email,
+            slot_display=slot_display,
+            duration_display=duration_display,
+            meet_link=meet_link,
+        )
 
-        self.email.send(
+        candidate_email = dict(
             to=request.candidate_email,
             subject=f"✅ Interview Confirmed – {request.job_title}",
-            body=candidate_body,
+            body=_CONFIRM_CANDIDATE_TPL.substitute(fields),
         )
 
-        # ── Email to RECRUITER ──
-        recruiter_body = f"""Hi,
-
-The interview has been successfully scheduled with the candidate.
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-  INTERVIEW BOOKED
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-  Role      : {request.job_title}
-  Candidate : {request.candidate_email}
-  Date      : {slot_display}
-  Duration  : {duration_display}{meet_link}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-A calendar invite has been added to your calendar automatically.
-
-Best regards,
-Interview Scheduling Assistant"""
-
-        self.email.send(
+        recruiter_email = dict(
             to=request.recruiter_email,
             subject=f"✅ Interview Booked – {request.job_title} | {slot_display}",
-            body=recruiter_body,
+            body=_CONFIRM_RECRUITER_TPL.substitute(fields),
         )
 
-        print(f"[Agent] 📧 Confirmation emails sent to {request.candidate_email} and {request.recruiter_email}")
+        self._send_all([candidate_email, recruiter_email])
+
+        _log.info("[Agent] 📧 Confirmation emails sent to %s and %s", request.candidate_email, request.recruiter_email)
+
+    def _send_all(self, emails: list[dict]) -> list:
+        """Send several emails (send() kwargs) concurrently; returns send() results in order."""
+        return list(self._email_pool.map(lambda kwargs: self.email.send(**kwargs), emails))
 
     def _send_cancellation_notice(self, request: InterviewRequest):
         self.email.send(
             to=request.recruiter_email,
             subject=f"Interview Declined – {request.job_title}",
-            body=f"""Hi,
-
-The candidate has declined the interview request.
-
-  Candidate : {request.candidate_email}
-  Position  : {request.job_title}
-
-Please reach out directly if you'd like to follow up.
-
-Best regards,
-Interview Scheduling Assistant""",
+            body=_CANCELLATION_TPL.substitute(
+                candidate_email=request.candidate_email, job_title=request.job_title
+            ),
         )
 
     def _escalate_to_recruiter(self, request: InterviewRequest):
         self.email.send(
             to=request.recruiter_email,
             subject=f"⚠️ Manual Scheduling Required – {request.job_title}",
-            body=f"""Hi,
-
-The automated scheduling agent was unable to find a mutually available time.
-
-  Candidate : {request.candidate_email}
-  Position  : {request.job_title}
-
-Please reach out to the candidate directly to schedule the interview.
-
-Best regards,
-Interview Scheduling Assistant""",
-        )
\ No newline at end of file
+            body=_ESCALATION_TPL.substitute(
+                candidate_email=request.candidate_email, job_title=request.job_title
+            ),
+        )
@@ -0,0 +1,105 @@
+import os
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import calendar_client
+from calendar_client import CalendarClient
+
+
+def reference_free_starts(client, first, time_max, duration_minutes, busy):
+    """Step every 30 minutes and test each start against every raw (unmerged) busy interval."""
+    starts = []
+    current = first
+    while current < time_max:
+        slot_end = current + timedelta(minutes=duration_minutes)
+        if (
+            current.weekday() in client.working_days
+            and client.working_hours_start <= current.time() < client.working_hours_end
+            and slot_end.date() == current.date()
+            and slot_end.time() <= client.working_hours_end
+            and not any(current < b_end and slot_end > b_start for b_start, b_end in busy)
+        ):
+            starts.append(current)
+        current += timedelta(minutes=30)
+    return starts
+
+
+class FreeStartsTest(unittest.TestCase):
+    # Friday 2026-10-16 — windows below cross a weekend
+    FRIDAY = datetime(2026, 10, 16)
+
+    def setUp(self):
+        self.client = CalendarClient({})
+
+    def assert_matches_reference(self, first, time_max, duration_minutes, raw_busy):
+        expected = reference_free_starts(self.client, first, time_max, duration_minutes, raw_busy)
+        busy = self.client._merge_busy(list(raw_busy))
+        self.assertEqual(list(self.client._free_starts(first, time_max, duration_minutes, busy)), expected)
+        if calendar_client.NUMPY_AVAILABLE:
+            self.assertEqual(self.client._free_starts_np(first, time_max, duration_minutes, busy), expected)
+
+    def test_merged_and_adjacent_busy_intervals(self):
+        day = self.FRIDAY - timedelta(days=4)  # Monday
+        raw_busy = [
+            (day.replace(hour=10), day.replace(hour=11)),
+            (day.replace(hour=10, minute=30), day.replace(hour=12)),  # overlaps the first
+            (day.replace(hour=12), day.replace(hour=12, minute=30)),  # adjacent to the merged pair
+            (day.replace(hour=13), day.replace(hour=13, minute=15)),  # off the 30-minute grid
+            (day.replace(hour=14), day.replace(hour=16)),
+            (day.replace(hour=14, minute=30), day.replace(hour=15)),  # nested
+        ]
+        busy = self.client._merge_busy(list(raw_busy))
+        self.assertEqual(busy[0], (day.replace(hour=10), day.replace(hour=12, minute=30)))
+        self.assertEqual(len(busy), 3)
+        for duration in (30, 45, 60, 90):
+            self.assert_matches_reference(day.replace(hour=8), day + timedelta(days=1), duration, raw_busy)
+
+    def test_weekend_and_after_hours_jumps(self):
+        first = self.FRIDAY.replace(hour=16, minute=30)
+        time_max = self.FRIDAY + timedelta(days=4)
+        for duration in (30, 60, 120):
+            self.assert_matches_reference(first, time_max, duration, [])
+        starts = list(self.client._free_starts(first, time_max, 60, []))
+        self.assertEqual(starts[0], self.FRIDAY.replace(hour=16, minute=30))
+        self.assertEqual(starts[2], datetime(2026, 10, 19, 9, 0))  # Friday evening → Monday opening
+        self.assertTrue(all(s.weekday() < 5 for s in starts))
+
+    def test_start_before_opening(self):
+        first = self.FRIDAY.replace(hour=3)
+        self.assert_matches_reference(first, first + timedelta(days=1), 60, [])
+
+    def test_random_busy_calendars(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            first = self.FRIDAY + timedelta(days=rng.randint(-4, 2), hours=rng.randint(0, 23),
+                                            minutes=rng.choice((0, 30)))
+            time_max = first + timedelta(days=rng.randint(0, 9))
+            raw_busy = []
+            for _ in range(rng.randint(0, 25)):
+                start = first + timedelta(minutes=15 * rng.randint(-8, 4 * 24 * 9))
+                raw_busy.append((start, start + timedelta(minutes=15 * rng.randint(1, 16))))
+            duration = rng.choice((15, 30, 45, 60, 90))
+            self.assert_matches_reference(first, time_max, duration, raw_busy)
+
+    @unittest.skipUnless(calendar_client.NUMPY_AVAILABLE, "numpy not installed")
+    def test_numpy_and_python_paths_agree(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            first = self.FRIDAY + timedelta(days=rng.randint(-4, 2), hours=rng.randint(0, 23))
+            time_max = first + timedelta(days=14)
+            raw_busy = []
+            for _ in range(rng.randint(0, 40)):
+                start = first + timedelta(minutes=30 * rng.randint(0, 48 * 14))
+                raw_busy.append((start, start + timedelta(minutes=30 * rng.randint(1, 6))))
+            busy = self.client._merge_busy(raw_busy)
+            duration = rng.choice((30, 60, 90))
+            self.assertEqual(self.client._free_starts_np(first, time_max, duration, busy),
+                             list(self.client._free_starts(first, time_max, duration, busy)))
+
+
+if __name__ == "__main__":
+    unittest.main()
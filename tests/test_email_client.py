@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from email_client import EmailClient, gmail_config
+
+
+SINGLE_PART_HEADER = (
+    b"From: Candidate <candidate@example.com>\r\n"
+    b"Subject: Re: Interview Scheduling\r\n"
+    b"MIME-Version: 1.0\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Transfer-Encoding: quoted-printable\r\n"
+    b"\r\n"
+)
+SINGLE_PART_BODY = (
+    b"Monday at 10am works for me =E2=80=94 thanks! This line is long enough to =\r\n"
+    b"need a soft break.\r\n"
+    b"\r\n"
+    b"> [Request ID: req_1700000000_ab12cd34]\r\n"
+)
+
+MULTIPART_HEADER = (
+    b"From: Other <other@example.com>\r\n"
+    b"Subject: Re: Interview Scheduling [req_1700000001_ef56ab78]\r\n"
+    b"MIME-Version: 1.0\r\n"
+    b'Content-Type: multipart/alternative; boundary="b1"\r\n'
+    b"\r\n"
+)
+MULTIPART_MIME = b"Content-Type: text/plain; charset=us-ascii\r\n\r\n"
+MULTIPART_BODY = b"Tuesday afternoon is better.\r\n"
+
+
+class SplitFetchResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.client = EmailClient(gmail_config("agent@example.com", "unused"))
+
+    def tearDown(self):
+        self.client._pool.shutdown(wait=False)
+
+    def test_single_part_quoted_printable_reply(self):
+        # The server has no MIME header of its own for part 1 of a single-part message
+        data = [
+            (b"7 (BODY[HEADER] {%d}" % len(SINGLE_PART_HEADER), SINGLE_PART_HEADER),
+            (b" BODY[1.MIME] NIL BODY[1] {%d}" % len(SINGLE_PART_BODY), SINGLE_PART_BODY),
+            b")",
+        ]
+        header, first_part = self.client._split_fetch_response(data)[b"7"]
+        self.assertEqual(header, SINGLE_PART_HEADER)
+
+        parsed = self.client._parse_raw_email(header, first_part)
+        self.assertEqual(parsed.sender, "candidate@example.com")
+        self.assertEqual(parsed.request_id, "req_1700000000_ab12cd34")
+        self.assertIn("Monday at 10am works for me — thanks!", parsed.body)
+        self.assertIn("long enough to need a soft break.", parsed.body)
+
+    def test_empty_mime_literal_falls_back_to_top_level_headers(self):
+        data = [
+            (b"7 (BODY[HEADER] {%d}" % len(SINGLE_PART_HEADER), SINGLE_PART_HEADER),
+            (b" BODY[1.MIME] {0}", b""),
+            (b" BODY[1] {%d}" % len(SINGLE_PART_BODY), SINGLE_PART_BODY),
+            b")",
+        ]
+        header, first_part = self.client._split_fetch_response(data)[b"7"]
+        parsed = self.client._parse_raw_email(header, first_part)
+        self.assertIn("—", parsed.body)
+
+    def test_batched_sections_are_matched_by_label(self):
+        # Message 3 leads with a NIL section, so its id arrives on a plain bytes item
+        data = [
+            (b"7 (BODY[HEADER] {%d}" % len(SINGLE_PART_HEADER), SINGLE_PART_HEADER),
+            (b" BODY[1.MIME] NIL BODY[1] {%d}" % len(SINGLE_PART_BODY), SINGLE_PART_BODY),
+            b")",
+            (b"9 (BODY[HEADER] {%d}" % len(MULTIPART_HEADER), MULTIPART_HEADER),
+            (b" BODY[1.MIME] {%d}" % len(MULTIPART_MIME), MULTIPART_MIME),
+            (b" BODY[1] {%d}" % len(MULTIPART_BODY), MULTIPART_BODY),
+            b")",
+            b"3 (BODY[HEADER] NIL BODY[1.MIME] NIL BODY[1] NIL)",
+        ]
+        split = self.client._split_fetch_response(data)
+        self.assertEqual(list(split), [b"7", b"9", b"3"])
+        self.assertEqual(split[b"9"], (MULTIPART_HEADER, MULTIPART_MIME + MULTIPART_BODY))
+        self.assertEqual(split[b"3"], (b"", b""))
+        self.assertEqual(split[b"7"][0], SINGLE_PART_HEADER)
+
+        parsed = self.client._parse_raw_email(*split[b"9"])
+        self.assertEqual(parsed.body, "Tuesday afternoon is better.\r\n")
+        self.assertEqual(parsed.request_id, "req_1700000001_ef56ab78")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import json
+import os
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import scheduler_agent
+from calendar_client import MockCalendarClient
+from scheduler_agent import InterviewRequest, SchedulerAgent
+
+
+class _Outbox:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, to, subject, body, reply_to=None):
+        self.sent.append(to)
+        return True
+
+
+class _LLM:
+    """Answers every extraction with offered slot 0; runs `on_call` first, if set."""
+
+    def __init__(self):
+        self.on_call = None
+
+    def _answer(self):
+        if self.on_call is not None:
+            self.on_call()
+        return json.dumps({"action": "provide_availability", "slot_ids": [0]})
+
+    def complete(self, prompt, **kwargs):
+        return self._answer()
+
+    async def complete_many(self, prompts, **kwargs):
+        return [self._answer() for _ in prompts]
+
+    async def aclose(self):
+        pass
+
+
+class EvictedReplyTest(unittest.TestCase):
+    def setUp(self):
+        self.llm = _LLM()
+        self.agent = SchedulerAgent(self.llm, _Outbox(), MockCalendarClient(), calendar_cache_ttl=0)
+        self.agent.MAX_ACTIVE_REQUESTS = 1
+
+    def _initiate(self, candidate="candidate@example.com"):
+        request_id, _ = self.agent.initiate_scheduling("recruiter@example.com", candidate, "Engineer")
+        return request_id
+
+    def _evict(self):
+        self._initiate("other@example.com")
+
+    def test_reply_to_evicted_request(self):
+        request_id = self._initiate()
+        self._evict()
+        self.assertNotIn(request_id, self.agent.active_requests)
+
+        result = self.agent.handle_email_reply(request_id, "candidate@example.com", "Monday works")
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(self.agent.handle_email_replies([(request_id, "candidate@example.com", "Monday works")]),
+                         [{"status": "error", "message": "Unknown request ID"}])
+        self.assertFalse(self.agent.wait_for_reply(request_id, timeout=0))
+
+    def test_request_evicted_while_reply_is_parsed(self):
+        request_id = self._initiate()
+        self.llm.on_call = self._evict
+        result = self.agent.handle_email_reply(request_id, "candidate@example.com", "Monday works")
+        self.assertEqual(result["status"], "confirmed")
+        self.assertNotIn(request_id, self.agent.active_requests)
+
+    def test_request_evicted_while_batch_is_parsed(self):
+        request_id = self._initiate()
+        self.llm.on_call = self._evict
+        [result] = self.agent.handle_email_replies([(request_id, "candidate@example.com", "Tuesday works")])
+        self.assertEqual(result["status"], "confirmed")
+        self.assertNotIn(request_id, self.agent.active_requests)
+
+
+def reference_overlap(agent, recruiter_slots, candidate_slots, duration_minutes):
+    """Every recruiter × candidate pair, checked in turn; first match per start wins, recruiter order."""
+    min_overlap = timedelta(minutes=duration_minutes)
+    starts = []
+    for rs in recruiter_slots:
+        try:
+            rs_start, rs_end = agent._parse_dt(rs["start"]), agent._parse_dt(rs["end"])
+        except ValueError:
+            continue
+        for cs in candidate_slots:
+            try:
+                cs_start = agent._parse_candidate_slot_start(cs)
+                cs_end = agent._parse_candidate_slot_end(cs, duration_minutes)
+            except ValueError:
+                continue
+            if (
+                (rs_start.date() == cs_start.date() and rs_start.hour == cs_start.hour)
+                or (rs_start.weekday() == cs_start.weekday() and rs_start.hour == cs_start.hour)
+                or (rs_start.date() == cs_start.date() and cs_start.hour == 0)
+                or min(rs_end, cs_end) - max(rs_start, cs_start) >= min_overlap
+            ):
+                if rs_start.isoformat() not in [s for s, _ in starts]:
+                    starts.append((rs_start.isoformat(), rs_end.isoformat()))
+                break
+    return starts
+
+
+class FindOverlapTest(unittest.TestCase):
+    MONDAY = datetime(2026, 10, 19)
+
+    def setUp(self):
+        self.agent = SchedulerAgent(None, None, None, calendar_cache_ttl=0)
+
+    def overlap(self, recruiter_slots, candidate_slots, duration_minutes, numpy_min_pairs):
+        request = InterviewRequest("recruiter@example.com", "candidate@example.com", "Engineer", duration_minutes)
+        self.agent._add_recruiter_slots(request, recruiter_slots)
+        self.agent.NUMPY_MIN_PAIRS = numpy_min_pairs
+        return [(s["start"], s["end"]) for s in self.agent._find_overlap(request, candidate_slots)]
+
+    def assert_matches_reference(self, recruiter_slots, candidate_slots, duration_minutes):
+        expected = reference_overlap(self.agent, recruiter_slots, candidate_slots, duration_minutes)
+        paths = [10 ** 9]  # indexed
+        if scheduler_agent.NUMPY_AVAILABLE:
+            paths.append(-1)  # vectorized, whatever the size
+        for numpy_min_pairs in paths:
+            self.assertEqual(self.overlap(recruiter_slots, candidate_slots, duration_minutes, numpy_min_pairs),
+                             expected, f"NUMPY_MIN_PAIRS={numpy_min_pairs}")
+
+    def _slot(self, start: datetime, minutes: int) -> dict:
+        return {"start": start.isoformat(), "end": (start + timedelta(minutes=minutes)).isoformat()}
+
+    def test_duplicate_starts_with_different_ends(self):
+        start = self.MONDAY.replace(hour=14)
+        recruiter = [self._slot(start, 30), self._slot(start, 90), self._slot(start + timedelta(hours=1), 60)]
+        # 13:15–15:30 shares 90 minutes with the second 14:00 slot, but only 30 with the first and the 15:00 one
+        candidates = [{"date": "2026-10-19", "start_time": "13:15", "end_time": "15:30"}]
+        self.assertEqual(self.overlap(recruiter, candidates, 60, 10 ** 9), [(recruiter[1]["start"], recruiter[1]["end"])])
+        self.assert_matches_reference(recruiter, candidates, 60)
+        # An exact hour match picks the first slot at that start
+        self.assert_matches_reference(recruiter, [{"date": "2026-10-19", "start_time": "14:00"}], 60)
+
+    def test_random_slots(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            duration = rng.choice((30, 45, 60, 90))
+            recruiter = []
+            for _ in range(rng.randint(0, 14)):
+                start = self.MONDAY + timedelta(days=rng.randint(0, 20), hours=rng.randint(8, 17),
+                                                minutes=rng.choice((0, 30)))
+                recruiter.append(self._slot(start, rng.choice((30, 60, duration))))
+            if recruiter and rng.random() < 0.3:
+                recruiter.append(dict(recruiter[0], end=self._slot(
+                    datetime.fromisoformat(recruiter[0]["start"]), 120)["end"]))
+            if rng.random() < 0.1:
+                recruiter.append({"start": "not a date", "end": "not a date"})
+            candidates = []
+            for _ in range(rng.randint(0, 6)):
+                day = self.MONDAY + timedelta(days=rng.randint(0, 20))
+                hour = rng.choice((0, 8, 9, 10, 11, 14, 15, 16))
+                cs = {"date": day.strftime("%Y-%m-%d"), "start_time": f"{hour:02d}:{rng.choice(('00', '15', '30'))}"}
+                if rng.random() < 0.5:
+                    cs["end_time"] = f"{min(hour + rng.randint(1, 4), 23):02d}:00"
+                candidates.append(cs)
+            if rng.random() < 0.05:
+                candidates.append({"date": ""})
+            self.assert_matches_reference(recruiter, candidates, duration)
+
+
+if __name__ == "__main__":
+    unittest.main()